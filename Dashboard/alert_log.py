@@ -0,0 +1,222 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from alerts import ALERT_RULES, AlertEngine
+
+ALERT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history', 'alerts.sqlite')
+# Сколько несохраненных изменений держать в памяти и как часто сбрасывать их на диск, секунды
+MAX_PENDING = 1000
+FLUSH_INTERVAL = 1.0
+# Размер страницы запроса по умолчанию и предельный
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_events (
+    id INTEGER PRIMARY KEY,
+    robot INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    parameter TEXT NOT NULL,
+    severity INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL,
+    value REAL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS alert_events_robot ON alert_events (robot, parameter, severity, start);
+CREATE INDEX IF NOT EXISTS alert_events_robot_start ON alert_events (robot, start);
+CREATE INDEX IF NOT EXISTS alert_events_parameter ON alert_events (parameter, severity, start);
+CREATE INDEX IF NOT EXISTS alert_events_start ON alert_events (start);
+"""
+
+EVENT_FIELDS = ('id', 'robot', 'channel', 'parameter', 'severity', 'start', 'end', 'value', 'message')
+
+
+# Журнал предупреждений: повторяющиеся тики сворачиваются в интервалы [start, end).
+# В памяти — только открытые события и еще не записанные изменения, остальное — в SQLite
+# с индексами по роботу, параметру (ключ PARAM_LIMITS), важности и времени
+class AlertEventLog:
+    def __init__(self, path=ALERT_LOG_PATH, rules=ALERT_RULES, max_pending=MAX_PENDING,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.rules = rules
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL: читатели других процессов не блокируют запись
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # (робот, номер правила) -> открытое событие
+        self._open = {}
+        self._inserts = []
+        self._updates = []
+        self._flushed = time.monotonic()
+
+    def record(self, robot, times, values, severity, previous):
+        """Переводит коды важности пакета (T, число правил) в события; previous — коды до пакета"""
+        severity = np.asarray(severity)
+        if not len(severity):
+            return
+        codes = np.concatenate([np.asarray(previous)[None], severity])
+        # Изменения редки: цикл только по ним, упорядоченным по времени
+        steps, rules = np.nonzero(codes[1:] != codes[:-1])
+        for step, rule in zip(steps.tolist(), rules.tolist()):
+            self.transition(robot, rule, int(codes[step + 1, rule]), float(times[step]),
+                            float(values[step, rule]))
+        if time.monotonic() - self._flushed > self.flush_interval:
+            self.flush()
+
+    def transition(self, robot, rule, severity, timestamp, value):
+        """Закрывает открытое событие правила и открывает новое, если severity не нулевая"""
+        with self._lock:
+            event = self._open.pop((robot, rule), None)
+            if event is not None:
+                event['end'] = timestamp
+                # Событие уже в базе — нужно обновить; иначе оно запишется вместе с концом
+                if event['id'] is not None:
+                    self._updates.append((timestamp, event['id']))
+            if severity:
+                channel, parameter = self.rules[rule][0], self.rules[rule][1]
+                event = {
+                    'id': None,
+                    'robot': robot,
+                    'channel': channel,
+                    'parameter': parameter,
+                    'severity': severity,
+                    'start': timestamp,
+                    'end': None,
+                    'value': value,
+                    'message': self.rules[rule][3 + severity].format(value)
+                }
+                self._open[(robot, rule)] = event
+                self._inserts.append(event)
+            pending = len(self._inserts) + len(self._updates)
+        if pending >= self.max_pending:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            inserts, self._inserts = self._inserts, []
+            updates, self._updates = self._updates, []
+            self._flushed = time.monotonic()
+            if not inserts and not updates:
+                return
+            with self._db:
+                for event in inserts:
+                    cursor = self._db.execute(
+                        'INSERT INTO alert_events (robot, channel, parameter, severity, start, end, value, message)'
+                        ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        [event[field] for field in EVENT_FIELDS[1:]])
+                    event['id'] = cursor.lastrowid
+                self._db.executemany('UPDATE alert_events SET end = ? WHERE id = ?', updates)
+
+    def close_stale(self, robot, timestamp=None):
+        """Закрывает события робота, оставшиеся открытыми после прошлого запуска.
+
+        Когда они на самом деле закончились, неизвестно; концом считается момент перезапуска
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock, self._db:
+            self._db.execute('UPDATE alert_events SET end = ? WHERE robot = ? AND end IS NULL',
+                             (timestamp, robot))
+
+    def close_all(self, timestamp=None):
+        """Закрывает все открытые события (например, при остановке источника телеметрии)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            keys = list(self._open)
+        for robot, rule in keys:
+            self.transition(robot, rule, 0, timestamp, 0.0)
+        self.flush()
+
+    def query(self, robot=None, parameter=None, severity=None, start=None, end=None,
+              limit=DEFAULT_PAGE_SIZE, before=None):
+        """События, начавшиеся в [start, end], от новых к старым (диапазон по индексу).
+
+        Страницы — по ключу: before — id последнего события предыдущей страницы.
+        Возвращает (события, before для следующей страницы или None)
+        """
+        self.flush()
+        conditions, params = [], []
+        for column, value in (('robot', robot), ('parameter', parameter), ('severity', severity)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if end is not None:
+            conditions.append('start <= ?')
+            params.append(end)
+        if start is not None:
+            conditions.append('start >= ?')
+            params.append(start)
+        if before is not None:
+            conditions.append('(start, id) < (SELECT start, id FROM alert_events WHERE id = ?)')
+            params.append(before)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(EVENT_FIELDS)} FROM alert_events {where}"
+                " ORDER BY start DESC, id DESC LIMIT ?", params + [limit + 1]).fetchall()
+        events = [dict(zip(EVENT_FIELDS, row)) for row in rows[:limit]]
+        return events, (events[-1]['id'] if len(rows) > limit else None)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+# Прогоняет новые отсчеты буфера телеметрии через собственный AlertEngine и пишет события.
+# Работает в процессе-писателе, независимо от того, открыт ли дашборд
+class AlertEventRecorder:
+    def __init__(self, buffer, channels, log=None, robot=0, interval=0.2):
+        self.buffer = buffer
+        self.log = log or AlertEventLog()
+        self.robot = robot
+        self.interval = interval
+        self.engine = AlertEngine()
+        self._columns = self.engine.rules.columns(channels)
+        self._time_column = channels.index('time')
+        self._count = buffer.count
+        # Время телеметрии переводится в Unix-время по моменту первого пакета (как в HistoryWriter)
+        self._time_offset = None
+        self._running = False
+        self._thread = None
+
+    def poll(self):
+        rows, self._count = self.buffer.since(self._count)
+        if not len(rows):
+            return
+        if self._time_offset is None:
+            self._time_offset = time.time() - rows[-1, self._time_column]
+        values = rows[:, self._columns]
+        previous = self.engine.severity
+        severity = self.engine.update(values)
+        self.log.record(self.robot, rows[:, self._time_column] + self._time_offset, values, severity, previous)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._count = self.buffer.count
+        self.log.close_stale(self.robot)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="alert-event-recorder")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self.poll()
+        self.log.close_all()
+
+    def _run(self):
+        while self._running:
+            time.sleep(self.interval)
+            self.poll()
@@ -0,0 +1,295 @@
+import threading
+
+import numpy as np
+
+import metrics
+from telemetry import SAMPLE_RATE_HZ
+
+# Пределы параметров
+PARAM_LIMITS = {
+    'motor_temp': {'warn': 70, 'critical': 85},
+    'vibration': {'warn': 0.15, 'critical': 0.25},
+    'battery_voltage': {'warn': 22, 'critical': 20},
+    'current': {'warn': 5, 'critical': 7},
+    'wheel_slip': {'warn': 0.2, 'critical': 0.3}
+}
+
+# Приоритеты сообщений
+ALERT_PRIORITY = {
+    'critical_temp': 50,
+    'critical_vibration': 45,
+    'critical_voltage': 40,
+    'critical_current': 40,
+    'critical_slip': 55,
+    'warn_temp': 30,
+    'warn_vibration': 25,
+    'warn_voltage': 20,
+    'warn_current': 20,
+    'warn_slip': 35,
+    'forecast_temp': 28,
+    'forecast_vibration': 24,
+    'forecast_voltage': 18,
+    'anomaly_vibration': 22,
+    'anomaly_temp': 22,
+    'normal': 0
+}
+
+def create_alert_message(param, value):
+    """Создает сообщение об ошибке с приоритетом"""
+    if param == 'motor_temp':
+        if value > PARAM_LIMITS['motor_temp']['critical']:
+            return {
+                'message': f"КРИТИЧЕСКАЯ температура: {value:.1f}°C",
+                'color': 'danger',
+                'priority': ALERT_PRIORITY['critical_temp']
+            }
+        elif value > PARAM_LIMITS['motor_temp']['warn']:
+            return {
+                'message': f"Высокая температура: {value:.1f}°C",
+                'color': 'warning',
+                'priority': ALERT_PRIORITY['warn_temp']
+            }
+
+    elif param == 'vibration':
+        if value > PARAM_LIMITS['vibration']['critical']:
+            return {
+                'message': f"КРИТИЧЕСКАЯ вибрация: {value:.2f}g",
+                'color': 'danger',
+                'priority': ALERT_PRIORITY['critical_vibration']
+            }
+        elif value > PARAM_LIMITS['vibration']['warn']:
+            return {
+                'message': f"Высокая вибрация: {value:.2f}g",
+                'color': 'warning',
+                'priority': ALERT_PRIORITY['warn_vibration']
+            }
+
+    elif param == 'voltage':
+        if value < PARAM_LIMITS['battery_voltage']['critical']:
+            return {
+                'message': f"КРИТИЧЕСКОЕ напряжение: {value:.1f}V",
+                'color': 'danger',
+                'priority': ALERT_PRIORITY['critical_voltage']
+            }
+        elif value < PARAM_LIMITS['battery_voltage']['warn']:
+            return {
+                'message': f"Низкое напряжение: {value:.1f}V",
+                'color': 'warning',
+                'priority': ALERT_PRIORITY['warn_voltage']
+            }
+
+    elif param == 'current':
+        if value > PARAM_LIMITS['current']['critical']:
+            return {
+                'message': f"КРИТИЧЕСКИЙ ток: {value:.1f}A",
+                'color': 'danger',
+                'priority': ALERT_PRIORITY['critical_current']
+            }
+        elif value > PARAM_LIMITS['current']['warn']:
+            return {
+                'message': f"Высокий ток: {value:.1f}A",
+                'color': 'warning',
+                'priority': ALERT_PRIORITY['warn_current']
+            }
+
+    elif param == 'wheel_slip':
+        if value > PARAM_LIMITS['wheel_slip']['critical']:
+            return {
+                'message': f"КРИТИЧЕСКАЯ пробуксовка: {value:.2f}",
+                'color': 'danger',
+                'priority': ALERT_PRIORITY['critical_slip']
+            }
+        elif value > PARAM_LIMITS['wheel_slip']['warn']:
+            return {
+                'message': f"Пробуксовка: {value:.2f}",
+                'color': 'warning',
+                'priority': ALERT_PRIORITY['warn_slip']
+            }
+
+    return None
+
+
+ALERTS_ACTIVE = metrics.Gauge('alerts_active', "Активные предупреждения", ('severity',))
+ALERTS_RAISED = metrics.Counter('alerts_raised_total', "Сработавшие предупреждения", ('severity',))
+
+SEVERITY_NORMAL = 0
+SEVERITY_WARNING = 1
+SEVERITY_CRITICAL = 2
+
+# Цвет dbc.Alert по коду важности
+SEVERITY_COLORS = {
+    SEVERITY_WARNING: 'warning',
+    SEVERITY_CRITICAL: 'danger'
+}
+
+# Таблица правил: канал телеметрии, ключ PARAM_LIMITS, направление (1 — выше предела,
+# -1 — ниже), суффикс ключа ALERT_PRIORITY, сообщения для warn и critical
+ALERT_RULES = (
+    ('motor_temp', 'motor_temp', 1, 'temp',
+     "Высокая температура: {:.1f}°C", "КРИТИЧЕСКАЯ температура: {:.1f}°C"),
+    ('vibration', 'vibration', 1, 'vibration',
+     "Высокая вибрация: {:.2f}g", "КРИТИЧЕСКАЯ вибрация: {:.2f}g"),
+    ('voltage', 'battery_voltage', -1, 'voltage',
+     "Низкое напряжение: {:.1f}V", "КРИТИЧЕСКОЕ напряжение: {:.1f}V"),
+    ('current', 'current', 1, 'current',
+     "Высокий ток: {:.1f}A", "КРИТИЧЕСКИЙ ток: {:.1f}A"),
+    ('left_slip', 'wheel_slip', 1, 'slip',
+     "Пробуксовка: {:.2f}", "КРИТИЧЕСКАЯ пробуксовка: {:.2f}"),
+    ('right_slip', 'wheel_slip', 1, 'slip',
+     "Пробуксовка: {:.2f}", "КРИТИЧЕСКАЯ пробуксовка: {:.2f}")
+)
+RULE_CHANNELS = tuple(rule[0] for rule in ALERT_RULES)
+
+# Ширина гистерезиса: предупреждение снимается, только когда значение
+# вернется за предел с запасом. От шума защищает ALERT_CLEAR_SECONDS, поэтому запас меньше
+# размаха шума: при широком запасе порог снятия ниже обычных значений канала, и предупреждение
+# не снимается (вибрация MotorSimulator не опускается ниже 0.11g)
+ALERT_HYSTERESIS = {
+    'motor_temp': 2.0,
+    'vibration': 0.01,
+    'battery_voltage': 0.3,
+    'current': 0.2,
+    'wheel_slip': 0.02
+}
+
+# Сколько секунд подряд значение должно быть за пределом, чтобы предупреждение сработало,
+# и сколько — за порогом снятия, чтобы оно снялось; в отсчеты переводятся по частоте телеметрии
+ALERT_DEBOUNCE_SECONDS = 0.5
+ALERT_CLEAR_SECONDS = 1.0
+
+
+# Правила, скомпилированные в массивы: все параметры проверяются за один проход NumPy
+class CompiledRules:
+    def __init__(self, rules=ALERT_RULES, limits=PARAM_LIMITS, hysteresis=ALERT_HYSTERESIS):
+        self.rules = rules
+        self.channels = tuple(rule[0] for rule in rules)
+        direction = np.array([rule[2] for rule in rules], dtype=float)
+        # Пороги хранятся со знаком направления, тогда условие всегда «значение > порога».
+        # Столбцы: 0 — warning, 1 — critical
+        enter = np.array([[limits[rule[1]]['warn'], limits[rule[1]]['critical']] for rule in rules])
+        width = np.array([hysteresis.get(rule[1], 0.0) for rule in rules])
+        self.direction = direction
+        self.enter = enter * direction[:, None]
+        self.exit = self.enter - width[:, None]
+        # Приоритет по коду важности: [normal, warning, critical]
+        self.priority = np.array([
+            [ALERT_PRIORITY['normal'],
+             ALERT_PRIORITY[f"warn_{rule[3]}"],
+             ALERT_PRIORITY[f"critical_{rule[3]}"]]
+            for rule in rules
+        ])
+
+    def columns(self, channels):
+        """Индексы каналов правил в строке телеметрии с каналами channels"""
+        return [channels.index(name) for name in self.channels]
+
+    def evaluate(self, values):
+        """Коды важности без учета состояния; values имеет форму (..., число правил)"""
+        signed = np.asarray(values, dtype=float) * self.direction
+        return ((signed > self.enter[:, 0]).astype(np.int8)
+                + (signed > self.enter[:, 1]).astype(np.int8))
+
+    def priorities(self, severity):
+        return self.priority[np.arange(len(self.rules)), severity]
+
+    def top_alerts(self, values, severity, k=3):
+        """K самых приоритетных сообщений одного отсчета в формате create_alert_message"""
+        priority = self.priorities(severity)
+        active = np.flatnonzero(severity)
+        # Устойчивая сортировка сохраняет порядок правил при равных приоритетах
+        order = active[np.argsort(-priority[active], kind='stable')][:k]
+        return [
+            {
+                'message': self.rules[i][3 + severity[i]].format(values[i]),
+                'color': SEVERITY_COLORS[int(severity[i])],
+                'priority': int(priority[i])
+            }
+            for i in order
+        ]
+
+
+# Оценка с гистерезисом и подавлением дребезга для пакета отсчетов.
+# Ось 0 входного массива — время, остальные (например, роботы) задаются shape
+class AlertEngine:
+    def __init__(self, shape=(), rules=None, rate_hz=SAMPLE_RATE_HZ, debounce=ALERT_DEBOUNCE_SECONDS,
+                 clear=ALERT_CLEAR_SECONDS):
+        self.rules = rules or CompiledRules()
+        # Задержки в отсчетах
+        self.debounce = max(1, round(debounce * rate_hz))
+        self.clear = max(1, round(clear * rate_hz))
+        state_shape = tuple(shape) + (len(self.rules.rules), 2)
+        # Для каждого уровня: активен ли он и сколько отсчетов подряд значение за порогом
+        # срабатывания (_run) и за порогом снятия (_clear_run)
+        self._active = np.zeros(state_shape, dtype=bool)
+        self._run = np.zeros(state_shape, dtype=np.int64)
+        self._clear_run = np.zeros(state_shape, dtype=np.int64)
+
+    @property
+    def severity(self):
+        """Текущие коды важности после последнего пакета"""
+        return self._active.sum(axis=-1).astype(np.int8)
+
+    def reset(self):
+        self._active[...] = False
+        self._run[...] = 0
+        self._clear_run[...] = 0
+
+    def update(self, values):
+        """Обрабатывает пакет формы (T, *shape, число правил), возвращает коды важности (T, ...)"""
+        signed = np.asarray(values, dtype=float)[..., None] * self.rules.direction[:, None]
+        above = signed > self.rules.enter
+        below = signed <= self.rules.exit
+
+        run = self._series(above, self._run)
+        clear_run = self._series(below, self._clear_run)
+
+        # Состояние уровня определяется последним событием: срабатывание или снятие
+        raised = run >= self.debounce
+        cleared = clear_run >= self.clear
+        event = np.where(raised, 1, np.where(cleared, -1, 0))
+        steps = np.arange(len(event)).reshape((-1,) + (1,) * (event.ndim - 1))
+        last = np.maximum.accumulate(np.where(event != 0, steps, -1), axis=0)
+        last_event = np.take_along_axis(event, np.maximum(last, 0), axis=0)
+        active = np.where(last >= 0, last_event == 1, self._active)
+
+        if len(active):
+            self._active = active[-1].copy()
+            self._run = run[-1]
+            self._clear_run = clear_run[-1]
+        return active.sum(axis=-1).astype(np.int8)
+
+    @staticmethod
+    def _series(condition, previous):
+        """Длина серии отсчетов подряд с condition с учетом хвоста предыдущего пакета"""
+        total = np.cumsum(condition, axis=0) + previous
+        return total - np.maximum.accumulate(np.where(condition, 0, total), axis=0)
+
+
+# Следит за буфером телеметрии и прогоняет через AlertEngine только новые отсчеты
+class TelemetryAlertMonitor:
+    def __init__(self, buffer, channels, engine=None):
+        self.buffer = buffer
+        self.engine = engine or AlertEngine()
+        self._columns = self.engine.rules.columns(channels)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Возвращает (значения, коды важности) правил для последнего отсчета"""
+        with self._lock:
+            rows, self._count = self.buffer.since(self._count)
+            if len(rows):
+                previous = self.engine.severity
+                severity = self.engine.update(rows[:, self._columns])
+                self._record_metrics(np.concatenate([previous[None], severity]))
+            latest = self.buffer.snapshot(1)
+            values = latest[0, self._columns] if len(latest) else np.zeros(len(self._columns))
+            return values, self.engine.severity
+
+    def _record_metrics(self, severity):
+        for code, color in SEVERITY_COLORS.items():
+            # Срабатывание — переход правила на уровень code или выше
+            raised = (severity[1:] >= code) & (severity[:-1] < code)
+            if raised.any():
+                ALERTS_RAISED.inc(int(raised.sum()), severity=color)
+            ALERTS_ACTIVE.set(int((severity[-1] == code).sum()), severity=color)
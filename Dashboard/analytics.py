@@ -0,0 +1,223 @@
+import math
+import threading
+
+import numpy as np
+
+from alerts import PARAM_LIMITS, ALERT_PRIORITY
+
+# Период полураспада весов скользящих оценок, секунды: старые отсчеты забываются плавно,
+# колебания нагрузки с периодом ~30 с сглаживаются и не дают ложных прогнозов
+ANALYTICS_HALFLIFE = 60.0
+# Сколько секунд данных нужно, прежде чем оценкам можно доверять: не меньше периода полураспада,
+# иначе наклон за первые секунды (рост нагрузки в начале цикла) дает ложный прогноз.
+# Считается по времени, а не по числу отсчетов — частота источника бывает разной
+ANALYTICS_WARMUP_SECONDS = ANALYTICS_HALFLIFE
+
+# Прогноз выхода за критический предел по тренду: канал, ключ PARAM_LIMITS,
+# направление (1 — рост к пределу, -1 — падение), ключ ALERT_PRIORITY, сообщение
+FORECAST_RULES = (
+    ('motor_temp', 'motor_temp', 1, 'forecast_temp', "Температура достигнет критической через ~{}"),
+    ('vibration', 'vibration', 1, 'forecast_vibration', "Вибрация достигнет критической через ~{}"),
+    ('voltage', 'battery_voltage', -1, 'forecast_voltage', "Напряжение упадет до критического через ~{}")
+)
+# Прогнозы дальше горизонта не показываются, секунды
+FORECAST_HORIZON = 600.0
+
+# Аномалия: сглаженное значение отклонилось от обычного уровня канала больше чем на ANOMALY_Z СКО
+ANOMALY_RULES = (
+    ('vibration', 'anomaly_vibration', "Аномальная вибрация: {:.2f}g ({:+.1f}σ)"),
+    ('motor_temp', 'anomaly_temp', "Аномальная температура: {:.1f}°C ({:+.1f}σ)")
+)
+ANOMALY_Z = 4.0
+
+# Цвет dbc.Alert для прогнозов: до срабатывания пределов это информация, а не тревога
+FORECAST_COLOR = 'info'
+
+
+def format_eta(seconds):
+    """Оценка времени для сообщения: «40 с», «4 мин»"""
+    if seconds < 90:
+        return f"{max(1, round(seconds))} с"
+    return f"{round(seconds / 60)} мин"
+
+
+# Потоковые оценки по каналам: O(1) памяти на канал и O(1) времени на отсчет.
+# Среднее и дисперсия за все время — алгоритм Уэлфорда (пакеты сливаются по Чану),
+# скользящие среднее, дисперсия и наклон — с экспоненциальным забыванием по времени.
+# Ось 0 входного пакета — время, остальные (роботы, каналы) задаются shape
+class StreamingStats:
+    def __init__(self, shape, halflife=ANALYTICS_HALFLIFE):
+        shape = tuple(shape)
+        self.decay_rate = math.log(2) / halflife
+        self.time = None
+        # Время первого отсчета скользящих оценок (сбрасывается вместе с ними)
+        self.start = None
+        # Уэлфорд: число отсчетов, среднее, сумма квадратов отклонений
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        # Экспоненциально взвешенные: суммарный вес, средние значения и времени
+        # (время — относительно последнего отсчета), дисперсии и ковариация
+        self._weight = 0.0
+        self.ewma = np.zeros(shape)
+        self._time_mean = 0.0
+        self._ew_var = np.zeros(shape)
+        self._time_var = 0.0
+        self._cov = np.zeros(shape)
+
+    @property
+    def variance(self):
+        return self._m2 / max(self.count - 1, 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def ew_std(self):
+        return np.sqrt(self._ew_var)
+
+    @property
+    def elapsed(self):
+        """Сколько секунд данных охватывают скользящие оценки"""
+        return 0.0 if self.time is None else self.time - self.start
+
+    @property
+    def slope(self):
+        """Скорость изменения в единицах канала в секунду (взвешенная линейная регрессия)"""
+        if self._time_var <= 0:
+            return np.zeros_like(self.ewma)
+        return self._cov / self._time_var
+
+    @property
+    def level(self):
+        """Значение линии тренда в момент последнего отсчета: в отличие от ewma, не запаздывает"""
+        return self.ewma - self.slope * self._time_mean
+
+    def zscore(self):
+        """Отклонение скользящего среднего от среднего за все время в СКО"""
+        std = self.std
+        return np.divide(self.ewma - self.mean, std, out=np.zeros_like(std), where=std > 0)
+
+    def update(self, times, values):
+        """Обрабатывает пакет: times — (T,) секунды, values — (T, *shape)"""
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        n = len(times)
+        if n == 0:
+            return
+        end = float(times[-1])
+        axes = (-1,) + (1,) * (values.ndim - 1)
+
+        # Уэлфорд/Чан: статистики пакета сливаются с накопленными
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.mean = self.mean + delta * n / total
+        self._m2 = self._m2 + batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+        # Веса отсчетов пакета и накопленного состояния на момент end
+        tau = times - end
+        weights = np.exp(self.decay_rate * tau)
+        prior = 0.0
+        # Время пошло назад (перезапуск источника, переход в записи) — скользящие оценки начинаются заново
+        if self.time is not None and end >= self.time:
+            prior = self._weight * math.exp(-self.decay_rate * (end - self.time))
+            # Начало отсчета времени переносится на новый последний отсчет
+            self._time_mean -= end - self.time
+        else:
+            self.start = float(times[0])
+        batch_weight = float(weights.sum())
+        w = (weights / batch_weight).reshape(axes)
+        batch_ewma = (w * values).sum(axis=0)
+        batch_time = float((weights * tau).sum() / batch_weight)
+        dx = values - batch_ewma
+        dt = (tau - batch_time).reshape(axes)
+        batch_var = (w * dx ** 2).sum(axis=0)
+        batch_time_var = float((weights * (tau - batch_time) ** 2).sum() / batch_weight)
+        batch_cov = (w * dx * dt).sum(axis=0)
+
+        weight = prior + batch_weight
+        f0, f1 = prior / weight, batch_weight / weight
+        mean_gap = self.ewma - batch_ewma
+        time_gap = self._time_mean - batch_time
+        self.ewma = f0 * self.ewma + f1 * batch_ewma
+        self._ew_var = f0 * self._ew_var + f1 * batch_var + f0 * f1 * mean_gap ** 2
+        self._time_mean = f0 * self._time_mean + f1 * batch_time
+        self._time_var = f0 * self._time_var + f1 * batch_time_var + f0 * f1 * time_gap ** 2
+        self._cov = f0 * self._cov + f1 * batch_cov + f0 * f1 * mean_gap * time_gap
+        self._weight = weight
+        self.time = end
+
+
+# Прогнозы и аномалии по StreamingStats, векторно для всех роботов
+class HealthForecaster:
+    def __init__(self, channels, forecast_rules=FORECAST_RULES, anomaly_rules=ANOMALY_RULES,
+                 limits=PARAM_LIMITS, horizon=FORECAST_HORIZON, anomaly_z=ANOMALY_Z):
+        self.forecast_rules = forecast_rules
+        self.anomaly_rules = anomaly_rules
+        self.horizon = horizon
+        self.anomaly_z = anomaly_z
+        self._forecast_columns = [channels.index(rule[0]) for rule in forecast_rules]
+        self._anomaly_columns = [channels.index(rule[0]) for rule in anomaly_rules]
+        self.direction = np.array([rule[2] for rule in forecast_rules], dtype=float)
+        # Критические пределы со знаком направления: условие всегда «значение растет к пределу»
+        self.critical = np.array([limits[rule[1]]['critical'] for rule in forecast_rules]) * self.direction
+
+    def time_to_critical(self, stats):
+        """Секунды до критического предела по тренду (*shape, число правил); inf — не ожидается"""
+        level = stats.level[..., self._forecast_columns] * self.direction
+        slope = stats.slope[..., self._forecast_columns] * self.direction
+        eta = np.full(level.shape, np.inf)
+        approaching = (slope > 0) & (level < self.critical)
+        np.divide(self.critical - level, slope, out=eta, where=approaching)
+        return eta
+
+    def anomalies(self, stats):
+        """z-оценки каналов ANOMALY_RULES (*shape, число правил)"""
+        return stats.zscore()[..., self._anomaly_columns]
+
+    def alerts(self, stats):
+        """Сообщения одного робота в формате create_alert_message"""
+        if stats.elapsed < ANALYTICS_WARMUP_SECONDS:
+            return []
+        result = []
+        eta = self.time_to_critical(stats)
+        for rule, seconds in zip(self.forecast_rules, eta.tolist()):
+            if seconds <= self.horizon:
+                result.append({
+                    'message': rule[4].format(format_eta(seconds)),
+                    'color': FORECAST_COLOR,
+                    'priority': ALERT_PRIORITY[rule[3]]
+                })
+        z = self.anomalies(stats)
+        ewma = stats.ewma[..., self._anomaly_columns]
+        for rule, score, value in zip(self.anomaly_rules, z.tolist(), ewma.tolist()):
+            if abs(score) >= self.anomaly_z:
+                result.append({
+                    'message': rule[2].format(value, score),
+                    'color': FORECAST_COLOR,
+                    'priority': ALERT_PRIORITY[rule[1]]
+                })
+        return result
+
+
+# Прогоняет новые отсчеты буфера телеметрии через StreamingStats
+class TelemetryAnalytics:
+    def __init__(self, buffer, channels, forecaster=None, halflife=ANALYTICS_HALFLIFE):
+        self.buffer = buffer
+        self.stats = StreamingStats((len(channels),), halflife)
+        self.forecaster = forecaster or HealthForecaster(channels)
+        self._time_column = channels.index('time')
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Обновляет оценки новыми отсчетами и возвращает прогнозные сообщения"""
+        with self._lock:
+            rows, self._count = self.buffer.since(self._count)
+            if len(rows):
+                self.stats.update(rows[:, self._time_column], rows)
+            return self.forecaster.alerts(self.stats)
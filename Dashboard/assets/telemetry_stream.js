@@ -0,0 +1,28 @@
+// Подписка на /telemetry/stream: каждый кадр кладется в dcc.Store 'telemetry-frame',
+// дальше виджеты обновляет clientside callback без запросов к серверу
+(function () {
+    function connect() {
+        const marker = document.getElementById('telemetry-push');
+        if (!marker || !window.dash_clientside || !window.dash_clientside.set_props) {
+            setTimeout(connect, 200);
+            return;
+        }
+        if (marker.dataset.enabled !== 'true') {
+            return;
+        }
+        // EventSource сам переподключается после обрыва соединения
+        const source = new EventSource('/telemetry/stream');
+        source.onmessage = function (event) {
+            window.dash_clientside.set_props('telemetry-frame', {data: JSON.parse(event.data)});
+        };
+        // Сервер отказал в потоке (например, синхронный воркер): EventSource больше не переподключается,
+        // виджеты обновляются опросом
+        source.onerror = function () {
+            if (source.readyState === EventSource.CLOSED) {
+                window.dash_clientside.set_props('data-update', {disabled: false});
+            }
+        };
+    }
+
+    window.addEventListener('load', connect);
+})();
@@ -0,0 +1,310 @@
+"""Бенчмарки и нагрузочные тесты дашборда и видеопотока.
+
+python benchmark.py micro
+python benchmark.py dash --clients 50 --duration 10 [--url http://127.0.0.1:8050 --server-pid PID]
+python benchmark.py mjpeg --viewers 20 --duration 10 [--cameras 4 --pipeline thread] [--url http://127.0.0.1:8081/video_feed --server-pid PID]
+
+Без --url сервер поднимается в этом же процессе (для mjpeg — с синтетической камерой),
+тогда в CPU сервера входит и нагрузка самих клиентов.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+MJPEG_BOUNDARY = b'--frame'
+
+
+def percentiles(values):
+    if not len(values):
+        return float('nan'), float('nan')
+    p50, p99 = np.percentile(values, [50, 99])
+    return p50, p99
+
+
+def cpu_seconds(pid=None):
+    """Процессорное время процесса pid (Linux, /proc) или текущего процесса"""
+    if pid is None:
+        return time.process_time()
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # utime и stime — 14-е и 15-е поля /proc/<pid>/stat
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def serve_in_thread(wsgi_app):
+    """Запускает WSGI-приложение на свободном порту, возвращает базовый URL"""
+    from werkzeug.serving import make_server
+
+    # Журнал запросов werkzeug искажает замеры и засоряет вывод
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, wsgi_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def time_calls(fn, iterations):
+    durations = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations[i] = time.perf_counter() - start
+    return durations
+
+
+# --- Микробенчмарки ---
+
+def run_micro(args):
+    from alerts import create_alert_message, CompiledRules, AlertEngine
+    from simulators import MotorSimulator, BatterySimulator, FleetSimulator
+    from analytics import StreamingStats
+    from fleet import SharedFleetState, FleetAggregator, FleetSimulatorFeed
+    import real_time_dash
+
+    motor = MotorSimulator()
+    battery = BatterySimulator()
+    rules = CompiledRules()
+    engine = AlertEngine()
+    fleet = FleetSimulator(1000, seed=0)
+    fleet_stats = StreamingStats((1000, len(rules.rules)))
+    batch = np.random.default_rng(0).uniform(0, 100, (1000, len(rules.rules)))
+    params = ('motor_temp', 'vibration', 'voltage', 'current', 'wheel_slip', 'wheel_slip')
+    values = (80.0, 0.2, 21.0, 6.0, 0.25, 0.1)
+    tick = iter(range(1, 1 << 62))
+    fleet_dir = tempfile.TemporaryDirectory()
+    fleet_state = SharedFleetState(directory=fleet_dir.name)
+    FleetSimulatorFeed(fleet_state, simulator=FleetSimulator(1000, seed=0)).step(1.0)
+    fleet_aggregator = FleetAggregator(fleet_state)
+    # Дождаться первых отсчетов в буфере
+    while real_time_dash.telemetry.latest() is None:
+        time.sleep(0.05)
+
+    cases = (
+        ('MotorSimulator.update', lambda: motor.update(0.01)),
+        ('BatterySimulator.update', lambda: battery.update(3.5, 0.01)),
+        ('create_alert_message x6', lambda: [create_alert_message(p, v) for p, v in zip(params, values)]),
+        ('CompiledRules.evaluate 1000x6', lambda: rules.evaluate(batch)),
+        ('AlertEngine.update 1000x6', lambda: engine.update(batch)),
+        ('FleetSimulator.update 1000', lambda: fleet.update(0.01)),
+        ('StreamingStats.update 1000x6', lambda: fleet_stats.update([next(tick) * 0.01], batch[None])),
+        ('FleetAggregator._aggregate 1000', fleet_aggregator._aggregate),
+        ('FleetAggregator.page 1000', lambda: fleet_aggregator.page(500, 50)),
+        ('build_frame', real_time_dash.build_frame),
+        ('update_data', lambda: real_time_dash.update_data(next(tick), 'benchmark'))
+    )
+    print(f"{'функция':32} {'p50, мкс':>10} {'p99, мкс':>10} {'вызовов/с':>12}")
+    for name, fn in cases:
+        durations = time_calls(fn, args.iterations)
+        p50, p99 = percentiles(durations * 1e6)
+        print(f"{name:32} {p50:10.1f} {p99:10.1f} {1 / durations.mean():12.0f}")
+
+
+# --- Нагрузка на callback Dash ---
+
+def find_update_callback(base_url):
+    """Тело запроса к _dash-update-component для серверного callback'а update_data"""
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port)
+    conn.request('GET', '/_dash-dependencies')
+    dependencies = json.loads(conn.getresponse().read())
+    conn.close()
+    for dep in dependencies:
+        if dep.get('clientside_function') or 'motor-temp.children' not in dep['output']:
+            continue
+        outputs = [o for o in dep['output'].strip('.').split('...') if o]
+        return {
+            'output': dep['output'],
+            'outputs': [dict(zip(('id', 'property'), o.split('.', 1))) for o in outputs],
+            'inputs': [{'id': 'data-update', 'property': 'n_intervals', 'value': 0}],
+            'state': [{'id': 'client-id', 'property': 'data', 'value': None}],
+            'changedPropIds': ['data-update.n_intervals']
+        }
+    raise RuntimeError("callback update_data не найден в /_dash-dependencies")
+
+
+def dash_client(base_url, template, client_no, interval, stop, stats):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port)
+    body = json.loads(json.dumps(template))
+    body['state'][0]['value'] = f"benchmark-{client_no}"
+    n = 0
+    while not stop.is_set():
+        n += 1
+        body['inputs'][0]['value'] = n
+        payload = json.dumps(body)
+        start = time.perf_counter()
+        conn.request('POST', '/_dash-update-component', payload,
+                     {'Content-Type': 'application/json'})
+        response = conn.getresponse().read()
+        elapsed = time.perf_counter() - start
+        stats['latency'].append(elapsed)
+        stats['bytes'] += len(response)
+        if interval > elapsed:
+            stop.wait(interval - elapsed)
+    conn.close()
+
+
+def run_dash(args):
+    base_url = args.url
+    if base_url is None:
+        import real_time_dash
+        base_url = serve_in_thread(real_time_dash.app.server)
+    template = find_update_callback(base_url)
+
+    stop = threading.Event()
+    stats = [{'latency': [], 'bytes': 0} for _ in range(args.clients)]
+    threads = [threading.Thread(target=dash_client, daemon=True,
+                                args=(base_url, template, i, args.interval, stop, stats[i]))
+               for i in range(args.clients)]
+    cpu_start = cpu_seconds(args.server_pid)
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cpu = cpu_seconds(args.server_pid) - cpu_start
+
+    latency = np.concatenate([s['latency'] for s in stats]) * 1e3
+    requests = len(latency)
+    total_bytes = sum(s['bytes'] for s in stats)
+    p50, p99 = percentiles(latency)
+    print(f"клиентов: {args.clients}, запросов: {requests} ({requests / args.duration:.1f}/с)")
+    print(f"задержка p50: {p50:.1f} мс, p99: {p99:.1f} мс")
+    print(f"байт на ответ: {total_bytes / max(requests, 1):.0f}, "
+          f"на клиента: {total_bytes / args.clients / args.duration:.0f} Б/с")
+    print(f"CPU сервера на клиента: {cpu / args.clients / args.duration * 100:.2f}%")
+
+
+# --- Нагрузка на MJPEG-поток ---
+
+# Синтетический источник кадров с интерфейсом cv2.VideoCapture: нагрузочные тесты без камеры
+class SyntheticCapture:
+    def __init__(self, index=0, width=640, height=480, fps=30):
+        self.index = index
+        self.period = 1.0 / fps
+        self._next = time.perf_counter()
+        self._n = 0
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        self._base = np.dstack([np.broadcast_to(x, (height, width)),
+                                np.broadcast_to(y, (height, width)),
+                                np.full((height, width), 64 * (index % 4), dtype=np.float32)]).astype(np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next + self.period, time.perf_counter() - self.period)
+        self._n += 1
+        # Сдвиг градиента и счетчик кадров, чтобы соседние кадры различались
+        frame = np.roll(self._base, self._n * 4, axis=1)
+        cv2.putText(frame, f"cam {self.index} #{self._n}", (10, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def mjpeg_viewer(url, stop, stats):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else '')
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    tail = b''
+    while not stop.is_set():
+        chunk = response.read1(65536)
+        if not chunk:
+            break
+        now = time.perf_counter()
+        stats['bytes'] += len(chunk)
+        # Граница кадра может прийти разрезанной между двумя кусками
+        data = tail + chunk
+        frames = data.count(MJPEG_BOUNDARY)
+        stats['frames'].extend([now] * frames)
+        tail = data[-(len(MJPEG_BOUNDARY) - 1):]
+    conn.close()
+
+
+def run_mjpeg(args):
+    url = args.url
+    if url is None:
+        import camera_component
+        # Синтетическая камера вместо реального устройства
+        broadcaster_factory = {'thread': camera_component.FrameBroadcaster,
+                               'process': camera_component.ProcessBroadcaster}[args.pipeline]
+        camera_component.registry = camera_component.CameraRegistry(
+            capture_factory=SyntheticCapture, broadcaster_factory=broadcaster_factory)
+        base = serve_in_thread(camera_component.camera_app) + '/video_feed'
+        query = f"?{args.query}" if args.query else ''
+        # Зрители распределяются по камерам поровну
+        urls = [f"{base}/{i % args.cameras}{query}" for i in range(args.viewers)]
+    else:
+        urls = [url] * args.viewers
+
+    stop = threading.Event()
+    stats = [{'frames': [], 'bytes': 0} for _ in range(args.viewers)]
+    threads = [threading.Thread(target=mjpeg_viewer, args=(urls[i], stop, stats[i]), daemon=True)
+               for i in range(args.viewers)]
+    cpu_start = cpu_seconds(args.server_pid)
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    cpu = cpu_seconds(args.server_pid) - cpu_start
+    for thread in threads:
+        thread.join(timeout=5)
+
+    fps = [len(s['frames']) / args.duration for s in stats]
+    gaps = np.concatenate([np.diff(s['frames']) for s in stats if len(s['frames']) > 1] or [[]]) * 1e3
+    p50, p99 = percentiles(gaps)
+    total_bytes = sum(s['bytes'] for s in stats)
+    print(f"зрителей: {args.viewers}, FPS на зрителя: среднее {np.mean(fps):.1f}, мин {min(fps):.1f}")
+    print(f"интервал между кадрами p50: {p50:.1f} мс, p99: {p99:.1f} мс")
+    print(f"на зрителя: {total_bytes / args.viewers / args.duration / 1024:.0f} КБ/с")
+    print(f"CPU сервера на зрителя: {cpu / args.viewers / args.duration * 100:.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки дашборда и видеопотока")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    micro = commands.add_parser('micro', help="микробенчмарки горячих функций")
+    micro.add_argument('--iterations', type=int, default=2000)
+
+    dash_load = commands.add_parser('dash', help="N клиентов Dash, опрашивающих update_data")
+    dash_load.add_argument('--clients', type=int, default=20)
+    dash_load.add_argument('--interval', type=float, default=1.0, help="период опроса, с (0 — без пауз)")
+    dash_load.add_argument('--duration', type=float, default=10.0)
+    dash_load.add_argument('--url', default=None, help="адрес работающего дашборда")
+    dash_load.add_argument('--server-pid', type=int, default=None)
+
+    mjpeg = commands.add_parser('mjpeg', help="M зрителей MJPEG-потока")
+    mjpeg.add_argument('--viewers', type=int, default=10)
+    mjpeg.add_argument('--duration', type=float, default=10.0)
+    mjpeg.add_argument('--query', default='', help="параметры потока для встроенного сервера, например w=320&q=60")
+    mjpeg.add_argument('--cameras', type=int, default=1, help="число синтетических камер встроенного сервера")
+    mjpeg.add_argument('--pipeline', choices=('thread', 'process'), default='process',
+                       help="конвейер камер встроенного сервера (camera_component.CAMERA_PIPELINE)")
+    mjpeg.add_argument('--url', default=None, help="адрес работающего /video_feed")
+    mjpeg.add_argument('--server-pid', type=int, default=None)
+
+    args = parser.parse_args()
+    {'micro': run_micro, 'dash': run_dash, 'mjpeg': run_mjpeg}[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Асинхронный (ASGI) сервер MJPEG-потока.
+
+Все соединения обслуживаются одним циклом событий и читают кадры из общего
+FrameBroadcaster. Запуск: python camera_async.py (нужен uvicorn).
+"""
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+import metrics
+from camera_component import registry, normalize_variant, stream_limits, StreamGate, DEFAULT_JPEG_QUALITY
+
+MJPEG_CONTENT_TYPE = b'multipart/x-mixed-replace; boundary=frame'
+
+
+# Переносит уведомления о новых кадрах из потока захвата в цикл событий
+class AsyncFrameHub:
+    def __init__(self, broadcaster, loop):
+        self.broadcaster = broadcaster
+        self._loop = loop
+        self._new_frame = loop.create_future()
+        # (width, quality) -> (seq, future): одно кодирование на вариант для всех соединений
+        self._encoding = {}
+        broadcaster.add_listener(self._notify_threadsafe)
+
+    def _notify_threadsafe(self):
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if not self._new_frame.done():
+            self._new_frame.set_result(None)
+        self._new_frame = self._loop.create_future()
+
+    async def wait_frame(self, last_seq, timeout=1.0):
+        """Ждет кадр новее last_seq; возвращает (seq, None), если захват остановлен"""
+        while True:
+            seq, frame = self.broadcaster.latest()
+            if seq != last_seq:
+                return seq, frame
+            if not self.broadcaster.running:
+                return seq, None
+            await asyncio.wait({self._new_frame}, timeout=timeout)
+
+    async def get_jpeg(self, seq, frame, width, quality):
+        key = (width, quality)
+        pending = self._encoding.get(key)
+        if pending is None or pending[0] < seq:
+            # Кодирование уходит в пул потоков, чтобы не блокировать цикл событий
+            future = self._loop.run_in_executor(None, self.broadcaster.get_jpeg,
+                                                seq, frame, width, quality)
+            pending = self._encoding[key] = (seq, future)
+        return await pending[1]
+
+
+_hubs = {}
+
+
+def get_hub(broadcaster):
+    hub = _hubs.get(broadcaster)
+    if hub is None:
+        hub = _hubs[broadcaster] = AsyncFrameHub(broadcaster, asyncio.get_running_loop())
+    return hub
+
+
+def _int_param(params, name):
+    try:
+        return int(params[name][0])
+    except (KeyError, ValueError):
+        return None
+
+
+def _float_param(params, name):
+    try:
+        return float(params[name][0])
+    except (KeyError, ValueError):
+        return None
+
+
+async def stream_mjpeg(hub, width, quality, limits, receive, send):
+    disconnected = asyncio.Event()
+    gate = StreamGate(**limits)
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', MJPEG_CONTENT_TYPE), (b'cache-control', b'no-cache')],
+    })
+    # Запуск захвата может ждать освобождения устройства, поэтому он вне цикла событий
+    await asyncio.get_running_loop().run_in_executor(None, hub.broadcaster.subscribe)
+    started = time.monotonic()
+    sent_bytes = 0
+    last_seq = 0
+    try:
+        while not disconnected.is_set():
+            delay = gate.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            seq, frame = await hub.wait_frame(last_seq)
+            if frame is None:
+                break
+            if seq == last_seq:
+                continue
+            thumbnail = hub.broadcaster.thumbnail(seq)
+            if not gate.should_send(thumbnail):
+                # Сцена не изменилась: кадр не кодируется и не отправляется
+                hub.broadcaster.record_gated()
+                last_seq = seq
+                continue
+            frame_bytes = await hub.get_jpeg(seq, frame, width, quality)
+            hub.broadcaster.record_sent(last_seq, seq, frame_bytes)
+            if hub.broadcaster.recorder is not None:
+                # Основной вариант для записи может понадобиться закодировать — вне цикла событий
+                await hub.get_jpeg(seq, frame, None, DEFAULT_JPEG_QUALITY)
+                hub.broadcaster.record_frame(seq, frame)
+            gate.sent(thumbnail)
+            last_seq = seq
+            sent_bytes += len(frame_bytes)
+            # send ждет освобождения буфера сокета; пока он занят, кадры копятся
+            # в общем слоте, и медленное соединение получает только последний
+            await send({
+                'type': 'http.response.body',
+                'body': (b'--frame\r\n'
+                         b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n'),
+                'more_body': True,
+            })
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        watcher.cancel()
+        hub.broadcaster.record_client(sent_bytes, time.monotonic() - started)
+        hub.broadcaster.unsubscribe()
+
+
+async def send_json(send, payload):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode()})
+
+
+async def send_not_found(send):
+    await send({'type': 'http.response.start', 'status': 404,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': b'Not Found'})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            registry.stop_all()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path'].rstrip('/')
+    if path == '/cameras':
+        await send_json(send, registry.cameras())
+        return
+    if path == '/metrics':
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', metrics.CONTENT_TYPE.encode())]})
+        await send({'type': 'http.response.body', 'body': metrics.render().encode()})
+        return
+
+    if path == '/video_feed':
+        cam_id = 'front'
+    elif path.startswith('/video_feed/'):
+        cam_id = path[len('/video_feed/'):]
+    else:
+        cam_id = None
+    broadcaster = registry.get(cam_id) if cam_id else None
+    if broadcaster is None:
+        await send_not_found(send)
+        return
+
+    params = parse_qs(scope['query_string'].decode('latin-1'))
+    width, quality = normalize_variant(_int_param(params, 'w'), _int_param(params, 'q'))
+    limits = stream_limits(broadcaster.limits, _float_param(params, 'fps'),
+                           _float_param(params, 'motion'), _float_param(params, 'keepalive'))
+    await stream_mjpeg(get_hub(broadcaster), width, quality, limits, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=8081)
@@ -1,34 +1,566 @@
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+
 import cv2
-from flask import Response, Flask
+import numpy as np
+from flask import Response, Flask, request, abort, jsonify
+
+import metrics
+from camera_workers import CameraWorker, WORKER_START_METHOD, remove_stale_rings
+from recorder import RECORDING_DIR, VIDEO_LOG, RecordingWriter, RecordingReader, ReplayClock, ReplayCapture
 
 camera_app = Flask(__name__)
-  # 0 — стандартная веб-камера
-
-for i in range(5):
-    cap = cv2.VideoCapture(i)
-    if cap.isOpened():
-        print(f"Камера найдена по индексу: {i}")
-        cap.release()
-    else:
-        print(f"Камера не найдена по индексу: {i}")
-def generate():
-    video = cv2.VideoCapture(0)
+
+# Сколько индексов устройств проверяется при поиске камер
+MAX_CAMERA_INDEX = 5
+# Именованные камеры робота: 0 — стандартная веб-камера
+CAMERA_ROLES = {
+    'front': 0,
+    'rear': 1
+}
+
+# Источник кадров: 'device' — камеры робота, 'replay' — запись recorder.RECORDING_DIR
+CAMERA_SOURCE = 'device'
+# Конвейер камеры устройства: 'process' — захват и кодирование в отдельном процессе на камеру,
+# 'thread' — в потоке процесса сервера. Процессы по умолчанию — только там, где их порождает forkserver
+CAMERA_PIPELINE = 'process' if WORKER_START_METHOD == 'forkserver' else 'thread'
+# Запись отправленных клиентам кадров в recorder.RECORDING_DIR для разбора инцидентов
+RECORD_VIDEO = False
+
+# Метрики конвейера камер (отдаются на /metrics)
+FRAMES_CAPTURED = metrics.Counter('camera_frames_captured_total', "Кадров получено с камеры", ('camera',))
+FRAMES_DROPPED = metrics.Counter('camera_frames_dropped_total',
+                                 "Кадров пропущено клиентами (медленное соединение, предел частоты)",
+                                 ('camera',))
+FRAMES_GATED = metrics.Counter('camera_frames_gated_total',
+                               "Кадров без заметных изменений, не отправленных клиентам", ('camera',))
+READ_SECONDS = metrics.Histogram('camera_read_seconds', "Время чтения кадра с камеры", ('camera',))
+ENCODE_SECONDS = metrics.Histogram('camera_encode_seconds', "Время кодирования кадра в JPEG", ('camera',))
+BYTES_SENT = metrics.Counter('camera_bytes_sent_total', "Байт отправлено клиентам", ('camera',))
+FRAMES_SENT = metrics.Counter('camera_frames_sent_total', "Кадров отправлено клиентам", ('camera',))
+VIEWERS = metrics.Gauge('camera_viewers', "Активные зрители потока", ('camera',))
+# По клиентам: наблюдаются при отключении, число рядов не зависит от числа клиентов
+CLIENT_BYTES = metrics.Histogram('camera_client_bytes', "Байт отправлено одному клиенту за соединение", ('camera',),
+                                 buckets=tuple(1024 * 4 ** i for i in range(12)))
+CLIENT_BYTES_PER_SECOND = metrics.Histogram('camera_client_bytes_per_second',
+                                            "Средняя скорость потока одного клиента, байт/с", ('camera',),
+                                            buckets=tuple(1024 * 2 ** i for i in range(14)))
+
+# Качество JPEG по умолчанию (как у cv2.imencode без параметров)
+DEFAULT_JPEG_QUALITY = 95
+MIN_STREAM_WIDTH = 64
+MAX_STREAM_WIDTH = 1920
+# Сколько вариантов кодирования камеры хранится в кэше; давно не запрошенные вытесняются
+MAX_JPEG_VARIANTS = 8
+# Ширина и качество округляются до шага, чтобы число вариантов кодирования было ограничено
+WIDTH_STEP = 16
+QUALITY_STEP = 5
+
+# Ограничения потока: предел частоты кадров, порог движения (средняя разница уменьшенных
+# кадров в уровнях яркости 0–255; 0 — отправлять каждый кадр) и период keepalive-кадра
+# при неподвижной сцене, секунды. Клиент может их переопределить:
+# /video_feed/rear?fps=5&motion=4&keepalive=10 (частота — не выше предела камеры)
+DEFAULT_STREAM_LIMITS = {'fps': 15.0, 'motion': 1.5, 'keepalive': 2.0}
+# Ограничения отдельных камер (по имени или индексу) поверх DEFAULT_STREAM_LIMITS
+CAMERA_STREAM_LIMITS = {
+    'rear': {'fps': 10.0}
+}
+# Ширина уменьшенного кадра для проверки движения
+MOTION_WIDTH = 32
+
+
+def normalize_variant(width=None, quality=None):
+    """Приводит параметры клиента (w, q) к ключу варианта кодирования"""
+    if width is not None:
+        width = max(MIN_STREAM_WIDTH, min(MAX_STREAM_WIDTH, width) // WIDTH_STEP * WIDTH_STEP)
+    if quality is None:
+        quality = DEFAULT_JPEG_QUALITY
+    quality = max(QUALITY_STEP, min(100, quality // QUALITY_STEP * QUALITY_STEP))
+    return width, quality
+
+
+def encode_jpeg(frame, width=None, quality=DEFAULT_JPEG_QUALITY):
+    """Масштабирует кадр до ширины width (с сохранением пропорций) и кодирует в JPEG"""
+    if width is not None and width < frame.shape[1]:
+        height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+def motion_thumbnail(frame):
+    """Уменьшенный кадр в оттенках серого для дешевого сравнения соседних кадров"""
+    height = max(1, round(frame.shape[0] * MOTION_WIDTH / frame.shape[1]))
+    # Сначала прореживание (INTER_NEAREST), затем усреднение: INTER_AREA по полному кадру в ~8 раз дороже
+    small = cv2.resize(frame, (MOTION_WIDTH * 4, height * 4), interpolation=cv2.INTER_NEAREST)
+    small = cv2.resize(small, (MOTION_WIDTH, height), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small.astype(np.int16)
+
+
+def stream_limits(base, fps=None, motion=None, keepalive=None):
+    """Ограничения потока клиента: параметры запроса поверх ограничений камеры"""
+    limits = dict(base)
+    if fps is not None and fps > 0:
+        limits['fps'] = min(fps, limits['fps']) if limits['fps'] else fps
+    if motion is not None and motion >= 0:
+        limits['motion'] = motion
+    if keepalive is not None and keepalive > 0:
+        limits['keepalive'] = keepalive
+    return limits
+
+
+# Решает для одного клиента, отправлять ли очередной кадр: предел частоты,
+# порог движения относительно последнего отправленного кадра и keepalive
+class StreamGate:
+    def __init__(self, fps=None, motion=0.0, keepalive=None):
+        self.min_interval = 1.0 / fps if fps else 0.0
+        self.motion = motion
+        self.keepalive = keepalive
+        self._sent_at = None
+        self._thumbnail = None
+
+    def delay(self):
+        """Сколько секунд ждать до следующего кадра из-за предела частоты"""
+        if self._sent_at is None:
+            return 0.0
+        return max(0.0, self._sent_at + self.min_interval - time.monotonic())
+
+    def should_send(self, thumbnail):
+        if self._sent_at is None or thumbnail is None or self._thumbnail is None or not self.motion:
+            return True
+        if self.keepalive and time.monotonic() - self._sent_at >= self.keepalive:
+            return True
+        return np.abs(thumbnail - self._thumbnail).mean() >= self.motion
+
+    def sent(self, thumbnail):
+        self._sent_at = time.monotonic()
+        self._thumbnail = thumbnail
+
+
+# Один поток захвата на камеру, клиенты читают последний кадр из общего слота
+class FrameBroadcaster:
+    def __init__(self, index=0, capture_factory=cv2.VideoCapture, recorder=None):
+        self.index = index
+        self.capture_factory = capture_factory
+        # RecordingWriter, в который пишутся отправленные клиентам кадры
+        self.recorder = recorder
+        # Ограничения потока камеры (DEFAULT_STREAM_LIMITS с поправками CAMERA_STREAM_LIMITS)
+        self.limits = dict(DEFAULT_STREAM_LIMITS)
+        # Уменьшенный последний кадр для проверки движения: (seq, кадр)
+        self._thumbnail = (0, None)
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._running = False
+        self._thread = None
+        # Кэш JPEG: (width, quality) -> (seq, bytes); каждый кадр кодируется один раз на вариант.
+        # Порядок — от давно запрошенных к недавним, лишние варианты вытесняются
+        self._jpeg_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._variant_locks = {}
+        # Обработчики, вызываемые потоком захвата после публикации кадра
+        self._listeners = []
+        self._subscribers = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            previous = self._thread
+        # Предыдущий поток захвата должен освободить устройство до повторного открытия
+        if previous is not None:
+            previous.join()
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._capture_loop, daemon=True,
+                                            name=f"camera-{self.index}")
+            self._thread.start()
+
+    def subscribe(self):
+        """Регистрирует зрителя; первый зритель запускает захват"""
+        with self._cond:
+            self._subscribers += 1
+        VIEWERS.inc(camera=self.index)
+        self.start()
+
+    def unsubscribe(self):
+        """Снимает зрителя; после ухода последнего захват останавливается"""
+        VIEWERS.dec(camera=self.index)
+        with self._cond:
+            self._subscribers -= 1
+            if self._subscribers > 0:
+                return
+        self.stop()
+
+    def add_listener(self, callback):
+        with self._cond:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._cond:
+            self._listeners.remove(callback)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _capture_loop(self):
+        video = self.capture_factory(self.index)
+        try:
+            while self._running:
+                with READ_SECONDS.time(camera=self.index):
+                    success, frame = video.read()
+                if not success:
+                    break
+                FRAMES_CAPTURED.inc(camera=self.index)
+                # Уменьшенный кадр считается один раз для всех клиентов
+                self._publish(frame, self._motion_thumbnail(frame))
+        finally:
+            video.release()
+            self._finish()
+
+    def _publish(self, frame, thumbnail):
+        # Публикация кадра не ждет клиентов: медленные просто пропустят кадры
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._thumbnail = (self._seq, thumbnail)
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback()
+
+    def _finish(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback()
+
+    def latest(self):
+        """Возвращает (seq, frame) последнего кадра без ожидания"""
+        with self._cond:
+            return self._seq, self._frame
+
+    def wait_frame(self, last_seq, timeout=1.0):
+        """Ждет кадр новее last_seq и возвращает (seq, frame); промежуточные кадры пропускаются"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != last_seq or not self._running, timeout)
+            return self._seq, self._frame
+
+    def thumbnail(self, seq):
+        """Уменьшенный кадр seq или None, если его уже сменил следующий"""
+        with self._cond:
+            thumbnail_seq, thumbnail = self._thumbnail
+        return thumbnail if thumbnail_seq == seq else None
+
+    def get_jpeg(self, seq, frame, width=None, quality=DEFAULT_JPEG_QUALITY):
+        """Возвращает JPEG кадра seq для варианта (width, quality), кодируя его не более одного раза"""
+        frame_width = self._frame_width(frame)
+        # Ширина не меньше кадра — это полный кадр, отдельный вариант для нее не нужен
+        if width is not None and frame_width is not None and width >= frame_width:
+            width = None
+        key = (width, quality)
+        with self._cache_lock:
+            cached = self._jpeg_cache.get(key)
+            if cached is not None:
+                self._jpeg_cache.move_to_end(key)
+                if cached[0] >= seq:
+                    return cached[1]
+            variant_lock = self._variant_locks.setdefault(key, threading.Lock())
+
+        # Клиенты одного варианта ждут друг друга, разные варианты кодируются параллельно
+        with variant_lock:
+            cached = self._jpeg_cache.get(key)
+            if cached is not None and cached[0] >= seq:
+                return cached[1]
+            with ENCODE_SECONDS.time(camera=self.index):
+                frame_bytes = self._encode(frame, width, quality)
+            with self._cache_lock:
+                self._jpeg_cache[key] = (seq, frame_bytes)
+                self._jpeg_cache.move_to_end(key)
+                while len(self._jpeg_cache) > MAX_JPEG_VARIANTS:
+                    evicted, _ = self._jpeg_cache.popitem(last=False)
+                    self._variant_locks.pop(evicted, None)
+            return frame_bytes
+
+    def _frame_width(self, frame):
+        return frame.shape[1]
+
+    def _motion_thumbnail(self, frame):
+        return motion_thumbnail(frame)
+
+    def _encode(self, frame, width, quality):
+        return encode_jpeg(frame, width, quality)
+
+    def record_client(self, sent_bytes, seconds):
+        """Учитывает завершившееся соединение клиента"""
+        CLIENT_BYTES.observe(sent_bytes, camera=self.index)
+        if seconds > 0:
+            CLIENT_BYTES_PER_SECOND.observe(sent_bytes / seconds, camera=self.index)
+
+    def record_gated(self):
+        FRAMES_GATED.inc(camera=self.index)
+
+    def record_sent(self, last_seq, seq, frame_bytes):
+        """Учитывает отправленный клиенту кадр и пропущенные перед ним"""
+        if last_seq and seq > last_seq + 1:
+            FRAMES_DROPPED.inc(seq - last_seq - 1, camera=self.index)
+        FRAMES_SENT.inc(camera=self.index)
+        BYTES_SENT.inc(len(frame_bytes), camera=self.index)
+
+    def record_frame(self, seq, frame):
+        """Пишет отправленный кадр в запись всегда в основном варианте, какой бы вариант ни ушел клиенту"""
+        if self.recorder is not None and self.recorder.wants_frame(self.index, seq):
+            self.recorder.write_frame(self.index, seq, self.get_jpeg(seq, frame))
+
+
+# Конвейер, кадры которого — уже готовые байты JPEG.
+# Основной вариант потока отдается как есть, остальные перекодируются
+class JpegBroadcaster(FrameBroadcaster):
+    # Ширина кадров известна после первого декодирования
+    _width = None
+
+    def _frame_width(self, frame):
+        return self._width
+
+    def _encode(self, frame, width, quality):
+        if width is None and quality == DEFAULT_JPEG_QUALITY:
+            return frame
+        decoded = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+        self._width = decoded.shape[1]
+        return encode_jpeg(decoded, width, quality)
+
+
+# Конвейер воспроизведения: кадры — байты JPEG из записи (recorder.ReplayCapture)
+class ReplayBroadcaster(JpegBroadcaster):
+    def _motion_thumbnail(self, frame):
+        # Записаны только отправленные кадры, проверять движение повторно незачем
+        return None
+
+
+# Захват, уменьшенный кадр и кодирование основного варианта — в отдельном процессе на камеру
+# (camera_workers.CameraWorker), так что камеры не делят одно ядро и GIL процесса сервера.
+# Здесь остается только копирование готового JPEG из кольца в общей памяти
+class ProcessBroadcaster(JpegBroadcaster):
+    def _capture_loop(self):
+        worker = None
+        last_seq = 0
+        try:
+            # Ошибка запуска тоже должна завершить конвейер (_finish), иначе зрители ждали бы вечно
+            worker = CameraWorker(self.index, self.capture_factory,
+                                  functools.partial(encode_jpeg, quality=DEFAULT_JPEG_QUALITY), motion_thumbnail)
+            worker.start()
+            while self._running:
+                if not worker.wait() and worker.alive:
+                    continue
+                latest = worker.ring.read_latest()
+                if latest is None or latest[0] == last_seq:
+                    if not worker.alive:
+                        break
+                    continue
+                seq, jpeg, thumbnail, read_seconds, encode_seconds = latest
+                # Кадры, записанные рабочим процессом между пробуждениями, тоже учитываются
+                FRAMES_CAPTURED.inc(seq - last_seq, camera=self.index)
+                READ_SECONDS.observe(read_seconds, camera=self.index)
+                ENCODE_SECONDS.observe(encode_seconds, camera=self.index)
+                last_seq = seq
+                self._publish(jpeg, thumbnail)
+        finally:
+            # Устройство должно освободиться до повторного запуска (см. start)
+            if worker is not None:
+                worker.join()
+            self._finish()
+
+
+# Реестр камер: фоновый поиск устройств и по одному конвейеру захвата на камеру
+class CameraRegistry:
+    def __init__(self, max_index=MAX_CAMERA_INDEX, roles=CAMERA_ROLES, capture_factory=cv2.VideoCapture,
+                 broadcaster_factory=FrameBroadcaster, recorder=None, stream_limits=CAMERA_STREAM_LIMITS):
+        self.max_index = max_index
+        self.stream_limits = stream_limits
+        self.capture_factory = capture_factory
+        self.broadcaster_factory = broadcaster_factory
+        self.recorder = recorder
+        self.roles = dict(roles)
+        self._lock = threading.Lock()
+        # Результаты поиска: индекс -> найдена ли камера
+        self._available = {}
+        self._broadcasters = {}
+        self.probed = threading.Event()
+
+    def start_probe(self):
+        """Запускает поиск камер в фоне, не блокируя старт сервера"""
+        threading.Thread(target=self._probe, daemon=True, name="camera-probe").start()
+
+    def _probe(self):
+        for i in range(self.max_index):
+            with self._lock:
+                broadcaster = self._broadcasters.get(i)
+            # Работающий конвейер уже держит устройство, повторно его не открываем
+            if broadcaster is not None and broadcaster.running:
+                found = True
+            else:
+                cap = self.capture_factory(i)
+                found = cap.isOpened()
+                cap.release()
+            with self._lock:
+                self._available[i] = found
+            if found:
+                print(f"Камера найдена по индексу: {i}")
+            else:
+                print(f"Камера не найдена по индексу: {i}")
+        self.probed.set()
+
+    def resolve(self, cam_id):
+        """Переводит имя ('front', 'rear') или номер камеры в индекс устройства"""
+        if cam_id in self.roles:
+            return self.roles[cam_id]
+        try:
+            index = int(cam_id)
+        except (TypeError, ValueError):
+            return None
+        return index if 0 <= index < self.max_index else None
+
+    def limits(self, index):
+        """Ограничения потока камеры: DEFAULT_STREAM_LIMITS с поправками по индексу и имени"""
+        limits = dict(DEFAULT_STREAM_LIMITS)
+        limits.update(self.stream_limits.get(index, {}))
+        for role, role_index in self.roles.items():
+            if role_index == index:
+                limits.update(self.stream_limits.get(role, {}))
+        return limits
+
+    def cameras(self):
+        with self._lock:
+            available = dict(self._available)
+        return {
+            'probed': self.probed.is_set(),
+            'available': sorted(i for i, found in available.items() if found),
+            'roles': self.roles
+        }
+
+    def get(self, cam_id):
+        """Возвращает конвейер камеры или None, если такой камеры нет"""
+        index = self.resolve(cam_id)
+        if index is None:
+            return None
+        with self._lock:
+            # Пока поиск не завершен, камеру пробуем открыть без ожидания его результатов
+            if self._available.get(index) is False:
+                return None
+            broadcaster = self._broadcasters.get(index)
+            if broadcaster is None:
+                broadcaster = self._broadcasters[index] = self.broadcaster_factory(
+                    index, self.capture_factory, self.recorder)
+                broadcaster.limits = self.limits(index)
+            return broadcaster
+
+    def stop_all(self):
+        with self._lock:
+            broadcasters = list(self._broadcasters.values())
+        for broadcaster in broadcasters:
+            broadcaster.stop()
+
+
+def create_registry():
+    if CAMERA_SOURCE == 'replay':
+        reader = RecordingReader(os.path.join(RECORDING_DIR, VIDEO_LOG))
+        # Часы общие с дашбордом: кадры и телеметрия воспроизводятся синхронно
+        clock = ReplayClock()
+        clock.ensure_started(reader.start_time, reader.end_time)
+        return CameraRegistry(capture_factory=lambda index: ReplayCapture(reader, clock, index),
+                              broadcaster_factory=ReplayBroadcaster)
+    recorder = RecordingWriter(os.path.join(RECORDING_DIR, VIDEO_LOG)) if RECORD_VIDEO else None
+    broadcaster_factory = FrameBroadcaster
+    if CAMERA_PIPELINE == 'process':
+        remove_stale_rings()
+        broadcaster_factory = ProcessBroadcaster
+    return CameraRegistry(broadcaster_factory=broadcaster_factory, recorder=recorder)
+
+
+# Рабочий процесс камеры (forkserver, spawn) выполняет этот модуль повторно:
+# в нем реестр не создается и устройства не перебираются
+registry = None
+if multiprocessing.current_process().name == 'MainProcess':
+    registry = create_registry()
+    registry.start_probe()
+
+
+def generate(broadcaster, width=None, quality=DEFAULT_JPEG_QUALITY, limits=None):
+    gate = StreamGate(**(limits or broadcaster.limits))
+    broadcaster.subscribe()
+    started = time.monotonic()
+    sent_bytes = 0
     try:
+        last_seq = 0
         while True:
-            success, frame = video.read()
-            if not success:
-                break
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
+            delay = gate.delay()
+            if delay > 0:
+                time.sleep(delay)
+            seq, frame = broadcaster.wait_frame(last_seq)
+            if seq == last_seq:
+                if not broadcaster.running:
+                    break
+                continue
+            thumbnail = broadcaster.thumbnail(seq)
+            if not gate.should_send(thumbnail):
+                # Сцена не изменилась: кадр не кодируется и не отправляется
+                broadcaster.record_gated()
+                last_seq = seq
+                continue
+            frame_bytes = broadcaster.get_jpeg(seq, frame, width, quality)
+            broadcaster.record_sent(last_seq, seq, frame_bytes)
+            broadcaster.record_frame(seq, frame)
+            gate.sent(thumbnail)
+            last_seq = seq
+            sent_bytes += len(frame_bytes)
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
     finally:
-        video.release()
+        broadcaster.record_client(sent_bytes, time.monotonic() - started)
+        broadcaster.unsubscribe()
 
+# Без defaults в правиле: иначе Werkzeug перенаправлял бы /video_feed/front на /video_feed
 @camera_app.route('/video_feed')
-def video_feed():
-    return Response(generate(),
+@camera_app.route('/video_feed/<cam_id>')
+def video_feed(cam_id='front'):
+    broadcaster = registry.get(cam_id)
+    if broadcaster is None:
+        abort(404)
+    # Вариант потока выбирается параметрами: /video_feed/rear?w=320&q=60&fps=5
+    width, quality = normalize_variant(request.args.get('w', type=int),
+                                       request.args.get('q', type=int))
+    limits = stream_limits(broadcaster.limits, request.args.get('fps', type=float),
+                           request.args.get('motion', type=float), request.args.get('keepalive', type=float))
+    return Response(generate(broadcaster, width, quality, limits),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@camera_app.route('/cameras')
+def cameras():
+    return jsonify(registry.cameras())
+
+@camera_app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
-    camera_app.run(host='0.0.0.0', port=8081, threaded=True)
\ No newline at end of file
+    camera_app.run(host='0.0.0.0', port=8081, threaded=True)
@@ -0,0 +1,253 @@
+import atexit
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from shared_state import SHARED_DIR
+
+# Число слотов кольца кадров камеры: читатель копирует последний кадр, пока писатель заполняет следующие
+FRAME_RING_SLOTS = 4
+# Место под JPEG в слоте, байты: кадр 1920x1080 при качестве 95 — около 1 МБ
+FRAME_SLOT_BYTES = 2 * 1024 * 1024
+# Место под уменьшенный кадр для проверки движения (MOTION_WIDTH x до 2 * MOTION_WIDTH)
+THUMBNAIL_SLOT_BYTES = 32 * 64
+# Рабочие процессы не порождаются fork из многопоточного сервера: копия унаследовала бы
+# слушающий сокет, дескрипторы и блокировки чужих потоков. На Linux их порождает forkserver
+# (чистый процесс, в котором заранее импортированы cv2 и NumPy), вне Linux — spawn.
+# В обоих случаях модуль __main__ выполняется в рабочем процессе повторно — см. camera_component.registry
+WORKER_START_METHOD = 'forkserver' if sys.platform.startswith('linux') else 'spawn'
+# Сколько ждать завершения рабочего процесса перед принудительной остановкой, секунды
+WORKER_STOP_TIMEOUT = 2.0
+
+if WORKER_START_METHOD == 'forkserver':
+    multiprocessing.get_context(WORKER_START_METHOD).set_forkserver_preload(['camera_workers'])
+# Файлы колец: robot_camera_<pid процесса сервера>_<индекс камеры>.ring
+RING_PREFIX = 'robot_camera_'
+RING_SUFFIX = '.ring'
+
+# Заголовок кольца: номер последнего записанного кадра, признак остановки писателя, число слотов
+RING_HEADER_WORDS = 4
+LATEST, STOPPED, SLOTS = range(3)
+
+# Описание слота: счетчик seqlock, номер кадра, размеры JPEG и уменьшенного кадра,
+# время чтения с камеры и кодирования (для метрик процесса сервера)
+SLOT_DTYPE = np.dtype([
+    ('lock', '<i8'),
+    ('seq', '<i8'),
+    ('size', '<i8'),
+    ('thumb_height', '<i4'),
+    ('thumb_width', '<i4'),
+    ('read_seconds', '<f8'),
+    ('encode_seconds', '<f8')
+])
+
+
+# Кольцо кадров одной камеры в общей памяти: пишет рабочий процесс захвата,
+# процесс сервера копирует последний кадр без сериализации и без очередей
+class SharedFrameRing:
+    def __init__(self, path, slots=FRAME_RING_SLOTS, create=False):
+        self.path = path
+        self.slot_bytes = FRAME_SLOT_BYTES + THUMBNAIL_SLOT_BYTES
+        size = RING_HEADER_WORDS * 8 + slots * (SLOT_DTYPE.itemsize + self.slot_bytes)
+        flags = os.O_RDWR | (os.O_CREAT | os.O_TRUNC if create else 0)
+        self._fd = os.open(path, flags, 0o600)
+        if create:
+            os.ftruncate(self._fd, size)
+        else:
+            # Число слотов задает писатель: читатель отображает файл целиком
+            size = os.fstat(self._fd).st_size
+        self._mmap = mmap.mmap(self._fd, size)
+        self._header = np.frombuffer(self._mmap, dtype=np.int64, count=RING_HEADER_WORDS)
+        if create:
+            self._header[SLOTS] = slots
+        self.slots = int(self._header[SLOTS])
+        self._meta = np.frombuffer(self._mmap, dtype=SLOT_DTYPE, offset=RING_HEADER_WORDS * 8, count=self.slots)
+        self._data = np.frombuffer(self._mmap, dtype=np.uint8, offset=RING_HEADER_WORDS * 8 + self._meta.nbytes,
+                                   count=self.slots * self.slot_bytes).reshape(self.slots, self.slot_bytes)
+
+    @property
+    def latest_seq(self):
+        return int(self._header[LATEST])
+
+    @property
+    def stopped(self):
+        return bool(self._header[STOPPED])
+
+    def write(self, jpeg, thumbnail, read_seconds, encode_seconds):
+        """Записывает кадр в следующий слот; вызывается только рабочим процессом камеры"""
+        if len(jpeg) > FRAME_SLOT_BYTES:
+            return False
+        seq = int(self._header[LATEST]) + 1
+        slot = seq % self.slots
+        meta = self._meta[slot:slot + 1]
+        meta['lock'] += 1
+        self._data[slot, :len(jpeg)] = np.frombuffer(jpeg, dtype=np.uint8)
+        if thumbnail is not None and thumbnail.size <= THUMBNAIL_SLOT_BYTES:
+            height, width = thumbnail.shape
+            self._data[slot, FRAME_SLOT_BYTES:FRAME_SLOT_BYTES + thumbnail.size] = thumbnail.ravel()
+        else:
+            height = width = 0
+        meta['seq'] = seq
+        meta['size'] = len(jpeg)
+        meta['thumb_height'] = height
+        meta['thumb_width'] = width
+        meta['read_seconds'] = read_seconds
+        meta['encode_seconds'] = encode_seconds
+        meta['lock'] += 1
+        self._header[LATEST] = seq
+        return True
+
+    def read_latest(self):
+        """Копия последнего кадра: (seq, JPEG, уменьшенный кадр или None, время чтения, время кодирования)"""
+        while True:
+            seq = int(self._header[LATEST])
+            if not seq:
+                return None
+            slot = seq % self.slots
+            lock = int(self._meta['lock'][slot])
+            # Писатель успел обойти кольцо и пишет в этот слот — берется кадр новее
+            if lock & 1 or int(self._meta['seq'][slot]) != seq:
+                time.sleep(0)
+                continue
+            meta = self._meta[slot].copy()
+            jpeg = self._data[slot, :meta['size']].tobytes()
+            height, width = int(meta['thumb_height']), int(meta['thumb_width'])
+            thumbnail = None
+            if height:
+                thumbnail = self._data[slot, FRAME_SLOT_BYTES:FRAME_SLOT_BYTES + height * width]
+                thumbnail = thumbnail.reshape(height, width).astype(np.int16)
+            if int(self._meta['lock'][slot]) == lock:
+                return seq, jpeg, thumbnail, float(meta['read_seconds']), float(meta['encode_seconds'])
+
+    def mark_stopped(self):
+        self._header[STOPPED] = 1
+
+    def close(self):
+        self._header = self._meta = self._data = None
+        self._mmap.close()
+        os.close(self._fd)
+
+
+# Кольца запущенных рабочих процессов: файлы удаляются и при выходе без остановки камер
+_ring_paths = set()
+
+
+@atexit.register
+def _remove_rings():
+    for path in list(_ring_paths):
+        _unlink(path)
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_stale_rings(directory=SHARED_DIR):
+    """Удаляет кольца, оставшиеся от серверов, которые завершились аварийно (kill -9)"""
+    removed = 0
+    for name in os.listdir(directory):
+        if not (name.startswith(RING_PREFIX) and name.endswith(RING_SUFFIX)):
+            continue
+        try:
+            pid = int(name[len(RING_PREFIX):-len(RING_SUFFIX)].split('_')[0])
+            os.kill(pid, 0)
+        except ValueError:
+            continue
+        except ProcessLookupError:
+            _unlink(os.path.join(directory, name))
+            removed += 1
+        except PermissionError:
+            # Процесс жив, но принадлежит другому пользователю
+            pass
+    return removed
+
+
+def capture_worker(index, capture_factory, path, encode, thumbnail, stop, frames):
+    """Тело рабочего процесса: чтение с камеры, уменьшенный кадр и JPEG, запись в кольцо"""
+    # Одна камера — одно ядро: внутренние потоки OpenCV только мешали бы соседним процессам
+    cv2.setNumThreads(1)
+    # Процесс сервера может погибнуть, не остановив камеру (kill -9): тогда процесс
+    # сам освобождает устройство и удаляет кольцо, которое больше некому удалить
+    parent = multiprocessing.parent_process()
+    ring = SharedFrameRing(path)
+    video = capture_factory(index)
+    orphaned = False
+    try:
+        while not stop.is_set():
+            if parent is not None and not parent.is_alive():
+                orphaned = True
+                break
+            start = time.perf_counter()
+            success, frame = video.read()
+            read_seconds = time.perf_counter() - start
+            if not success:
+                break
+            start = time.perf_counter()
+            small = thumbnail(frame)
+            jpeg = encode(frame)
+            encode_seconds = time.perf_counter() - start
+            if not ring.write(jpeg, None if small is None else small.astype(np.uint8),
+                              read_seconds, encode_seconds):
+                print(f"Камера {index}: кадр {len(jpeg)} байт не помещается в слот кольца")
+                continue
+            frames.release()
+    finally:
+        video.release()
+        ring.mark_stopped()
+        ring.close()
+        frames.release()
+        if orphaned:
+            _unlink(path)
+
+
+# Рабочий процесс одной камеры и его кольцо кадров; seq кадров в кольце идут с 1 при каждом запуске
+class CameraWorker:
+    def __init__(self, index, capture_factory, encode, thumbnail, directory=SHARED_DIR):
+        self.index = index
+        self.path = os.path.join(directory, f"{RING_PREFIX}{os.getpid()}_{index}{RING_SUFFIX}")
+        self.ring = SharedFrameRing(self.path, create=True)
+        _ring_paths.add(self.path)
+        context = multiprocessing.get_context(WORKER_START_METHOD)
+        self._stop = context.Event()
+        # Семафор только будит процесс сервера; сами кадры идут через кольцо
+        self._frames = context.Semaphore(0)
+        self._process = context.Process(
+            target=capture_worker, name=f"camera-worker-{index}", daemon=True,
+            args=(index, capture_factory, self.path, encode, thumbnail, self._stop, self._frames))
+
+    def start(self):
+        self._process.start()
+
+    def wait(self, timeout=1.0):
+        """Ждет сигнала о новом кадре; накопившиеся сигналы сбрасываются — нужен только последний кадр"""
+        if not self._frames.acquire(timeout=timeout):
+            return False
+        while self._frames.acquire(False):
+            pass
+        return True
+
+    @property
+    def alive(self):
+        return self._process.is_alive() and not self.ring.stopped
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        self._stop.set()
+        if self._process.pid is not None:
+            self._process.join(WORKER_STOP_TIMEOUT)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self.ring.close()
+        os.unlink(self.path)
+        _ring_paths.discard(self.path)
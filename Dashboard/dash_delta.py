@@ -0,0 +1,39 @@
+import threading
+from collections import OrderedDict
+
+# Сколько клиентов помнить и как часто (в тиках) отправлять все выходы целиком.
+# Полная отправка страхует от ответов, которые браузер отбросил
+MAX_CLIENTS = 256
+FULL_REFRESH_TICKS = 10
+
+
+# Помнит последние отправленные значения выходов callback'а для каждого клиента
+class DeltaTracker:
+    def __init__(self, max_clients=MAX_CLIENTS, full_refresh=FULL_REFRESH_TICKS):
+        self.max_clients = max_clients
+        self.full_refresh = full_refresh
+        # client_id -> (номер тика, значения)
+        self._sent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def changed(self, client_id, tick, values):
+        """Возвращает список флагов: какие из values нужно отправить клиенту.
+
+        Все выходы отправляются, если клиент новый, тики идут не подряд
+        (ответ мог потеряться или прийти от другого процесса) или подошла полная отправка
+        """
+        values = tuple(values)
+        with self._lock:
+            previous = self._sent.pop(client_id, None)
+            self._sent[client_id] = (tick, values)
+            while len(self._sent) > self.max_clients:
+                self._sent.popitem(last=False)
+
+        full = (previous is None
+                or tick is None
+                or previous[0] is None
+                or tick != previous[0] + 1
+                or tick % self.full_refresh == 0)
+        if full:
+            return [True] * len(values)
+        return [new != old for new, old in zip(values, previous[1])]
@@ -0,0 +1,150 @@
+"""Монитор робота без Dash для бортового компьютера.
+
+Сбор телеметрии, проверка пределов и (по желанию) запись идут в одном цикле без потоков;
+отсчеты отправляются на центральный дашборд по UDP (там TELEMETRY_SOURCE = 'udp').
+Память фиксирована: кольцевой буфер на EDGE_BUFFER_SECONDS и состояние AlertEngine.
+
+python edge_monitor.py --host 192.168.0.10 [--record] [--alert-log] [--duration 60]
+"""
+import argparse
+import os
+import socket
+import time
+
+import numpy as np
+
+from alerts import AlertEngine, SEVERITY_COLORS
+from telemetry import TelemetryAcquisition, TelemetryBuffer, CHANNELS, SAMPLE_RATE_HZ
+from udp_ingest import UDP_PORT, DEFAULT_BATCH, pack_packet, rows_to_records
+
+# Глубина локального буфера, секунды: больше бортовому монитору не нужно
+EDGE_BUFFER_SECONDS = 10
+# Период цикла: за один проход обрабатываются все накопившиеся отсчеты
+EDGE_LOOP_INTERVAL = 0.05
+
+
+# Цикл бортового монитора: сбор -> буфер -> пределы -> отправка и запись
+class EdgeMonitor:
+    def __init__(self, rate_hz=SAMPLE_RATE_HZ, host='127.0.0.1', port=UDP_PORT, robot_id=0,
+                 batch=DEFAULT_BATCH, recorder=None, alert_log=None, publish=True):
+        self.rate_hz = rate_hz
+        self.buffer = TelemetryBuffer(int(rate_hz * EDGE_BUFFER_SECONDS))
+        self.acquisition = TelemetryAcquisition(self.buffer, rate_hz=rate_hz)
+        self.engine = AlertEngine(rate_hz=rate_hz)
+        self._columns = self.engine.rules.columns(CHANNELS)
+        self.address = (host, port)
+        self.robot_id = robot_id
+        self.batch = batch
+        self.recorder = recorder
+        self.alert_log = alert_log
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if publish else None
+        self._seq = 0
+        self._start_wall = time.time()
+        self.samples = 0
+        self.alerts = 0
+
+    def publish(self, rows):
+        """Отправляет отсчеты пакетами по batch записей; время — Unix-время робота"""
+        records = rows_to_records(rows)
+        records['time'] += self._start_wall
+        for start in range(0, len(records), self.batch):
+            try:
+                self._sock.sendto(pack_packet(records[start:start + self.batch], self.robot_id, self._seq),
+                                  self.address)
+            except OSError:
+                # Сеть до дашборда может пропадать; бортовой контроль от нее не зависит
+                pass
+            self._seq += 1
+
+    def check(self, rows):
+        """Прогоняет отсчеты через AlertEngine и сообщает о сменах уровня предупреждений"""
+        values = rows[:, self._columns]
+        previous = self.engine.severity
+        severity = self.engine.update(values)
+        times = rows[:, 0] + self._start_wall
+        if self.alert_log is not None:
+            self.alert_log.record(self.robot_id, times, values, severity, previous)
+        codes = np.concatenate([previous[None], severity])
+        steps, rules = np.nonzero(codes[1:] != codes[:-1])
+        for step, rule in zip(steps.tolist(), rules.tolist()):
+            code = int(codes[step + 1, rule])
+            moment = time.strftime('%H:%M:%S', time.localtime(times[step]))
+            if code:
+                self.alerts += 1
+                message = self.engine.rules.rules[rule][3 + code].format(values[step, rule])
+                print(f"{moment} [{SEVERITY_COLORS[code]}] {message}", flush=True)
+            else:
+                print(f"{moment} [ok] {self.engine.rules.channels[rule]} в норме", flush=True)
+
+    def step(self, due):
+        rows = self.acquisition.block(due, 1.0 / self.rate_hz)
+        self.buffer.extend(rows)
+        self.samples += len(rows)
+        self.check(rows)
+        if self._sock is not None:
+            self.publish(rows)
+        if self.recorder is not None:
+            self.recorder.write_telemetry(rows, self._start_wall + rows[-1, 0])
+
+    def run(self, duration=None):
+        period = 1.0 / self.rate_hz
+        start = next_tick = time.perf_counter()
+        while duration is None or time.perf_counter() - start < duration:
+            # Все отсчеты, чей срок наступил, обрабатываются одним блоком (как в TelemetryAcquisition)
+            due = int((time.perf_counter() - next_tick) / period) + 1
+            if due > self.buffer.capacity:
+                next_tick = time.perf_counter()
+                due = 1
+            self.step(due)
+            next_tick += due * period
+            # Просыпаемся, когда накопится EDGE_LOOP_INTERVAL отсчетов: меньше пробуждений процессора
+            delay = next_tick + EDGE_LOOP_INTERVAL - period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.alert_log is not None:
+            self.alert_log.close_all()
+            self.alert_log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бортовой монитор робота без Dash")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес центрального дашборда")
+    parser.add_argument('--port', type=int, default=UDP_PORT)
+    parser.add_argument('--robot-id', type=int, default=0)
+    parser.add_argument('--rate', type=float, default=SAMPLE_RATE_HZ, help="частота отсчетов, Гц")
+    parser.add_argument('--no-publish', action='store_true', help="не отправлять телеметрию на дашборд")
+    parser.add_argument('--record', action='store_true', help="писать телеметрию в recorder.RECORDING_DIR")
+    parser.add_argument('--alert-log', action='store_true', help="вести журнал предупреждений (SQLite)")
+    parser.add_argument('--duration', type=float, default=None, help="время работы, с")
+    args = parser.parse_args()
+
+    # Запись и журнал подключаются, только если нужны
+    recorder = None
+    if args.record:
+        from recorder import RECORDING_DIR, TELEMETRY_LOG, RecordingWriter
+        recorder = RecordingWriter(os.path.join(RECORDING_DIR, TELEMETRY_LOG))
+    alert_log = None
+    if args.alert_log:
+        from alert_log import AlertEventLog
+        alert_log = AlertEventLog()
+
+    monitor = EdgeMonitor(args.rate, args.host, args.port, args.robot_id,
+                          recorder=recorder, alert_log=alert_log, publish=not args.no_publish)
+    print(f"Монитор запущен: {args.rate:.0f} Гц, дашборд {args.host}:{args.port}", flush=True)
+    try:
+        monitor.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.close()
+    print(f"Обработано отсчетов: {monitor.samples}, предупреждений: {monitor.alerts}")
+
+
+if __name__ == '__main__':
+    main()
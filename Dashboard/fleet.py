@@ -0,0 +1,319 @@
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+from numpy.lib import recfunctions
+
+from alerts import AlertEngine, CompiledRules
+from shared_state import SHARED_DIR
+from simulators import FleetSimulator
+from telemetry import CHANNELS, CHANNEL_INDEX
+from udp_ingest import UDP_HOST, UDP_PORT, UdpTelemetryReceiver, parse_packet
+
+# Сколько роботов помещается в общее состояние парка
+FLEET_CAPACITY = 1024
+# Роботы шлют телеметрию для обзора парка на отдельный порт (edge_monitor.py --port)
+FLEET_UDP_PORT = UDP_PORT + 1
+# Число роботов и частота обновления симулятора парка
+FLEET_SIZE = 300
+FLEET_RATE_HZ = 2.0
+# Робот без пакетов дольше этого считается недоступным, секунды
+FLEET_STALE_SECONDS = 5.0
+# id робота дашборда: его предупреждения пишет alert_log.AlertEventRecorder по полному потоку
+# телеметрии, поэтому роботы симулятора парка нумеруются с 1, а в журнал парка он не попадает
+DASHBOARD_ROBOT = 0
+# Строк таблицы парка на странице по умолчанию и предельно
+FLEET_PAGE_SIZE = 50
+MAX_FLEET_PAGE_SIZE = 500
+
+# Состояние робота в обзоре: худший код важности его правил или «нет связи»
+STATUS_OFFLINE = 3
+STATUS_NAMES = ('normal', 'warning', 'critical', 'offline')
+# Порядок строк: сначала критические, затем предупреждения, недоступные и в норме
+STATUS_RANK = np.array([0, 2, 3, 1])
+
+# Заголовок: счетчик seqlock, число роботов
+FLEET_HEADER_WORDS = 2
+SEQ, COUNT = range(FLEET_HEADER_WORDS)
+
+
+# Последний отсчет каждого робота парка в общей памяти: (id, время приема, строка каналов CHANNELS).
+# Пишет процесс-писатель (seqlock, как в SharedTelemetryBuffer), читают все воркеры
+class SharedFleetState:
+    def __init__(self, capacity=FLEET_CAPACITY, name='robot_fleet', directory=SHARED_DIR):
+        self.capacity = capacity
+        width = len(CHANNELS)
+        self.path = os.path.join(directory, f"{name}_{capacity}x{width}.buf")
+        size = (FLEET_HEADER_WORDS + capacity * (2 + width)) * 8
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        offset = FLEET_HEADER_WORDS * 8
+        self._header = np.frombuffer(self._mmap, dtype=np.int64, count=FLEET_HEADER_WORDS)
+        self._ids = np.frombuffer(self._mmap, dtype=np.int64, offset=offset, count=capacity)
+        self._seen = np.frombuffer(self._mmap, dtype=np.float64, offset=offset + capacity * 8, count=capacity)
+        self._values = np.frombuffer(self._mmap, dtype=np.float64, offset=offset + capacity * 16,
+                                     count=capacity * width).reshape(capacity, width)
+        self._write_lock = threading.Lock()
+        # id робота -> строка; ведет только писатель, при смене писателя восстанавливается из памяти
+        self._slots = None
+
+    @property
+    def seq(self):
+        return int(self._header[SEQ])
+
+    def __len__(self):
+        return int(self._header[COUNT])
+
+    def _read(self, reader):
+        while True:
+            seq = int(self._header[SEQ])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            result = reader(int(self._header[COUNT]))
+            if int(self._header[SEQ]) == seq:
+                return result
+
+    def update(self, robot_ids, rows, seen=None):
+        """Записывает последние отсчеты роботов robot_ids (rows — (n, len(CHANNELS))); только писатель"""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(CHANNELS))
+        seen = time.time() if seen is None else seen
+        with self._write_lock:
+            count = int(self._header[COUNT])
+            if self._slots is None:
+                self._slots = {robot: i for i, robot in enumerate(self._ids[:count].tolist())}
+            slots = []
+            for robot in robot_ids:
+                slot = self._slots.get(robot)
+                if slot is None:
+                    if count >= self.capacity:
+                        slots.append(-1)
+                        continue
+                    slot = self._slots[robot] = count
+                    count += 1
+                slots.append(slot)
+            slots = np.array(slots, dtype=np.int64)
+            known = slots >= 0
+            self._header[SEQ] += 1
+            self._ids[slots[known]] = np.asarray(robot_ids)[known]
+            self._seen[slots[known]] = seen
+            self._values[slots[known]] = rows[known]
+            self._header[COUNT] = count
+            self._header[SEQ] += 1
+
+    def snapshot(self):
+        """Копии (id, время приема, отсчеты) всех роботов"""
+        return self._read(lambda count: (self._ids[:count].copy(), self._seen[:count].copy(),
+                                         self._values[:count].copy()))
+
+
+# Прием телеметрии парка по UDP: из каждого пакета в состояние попадает только последний отсчет
+class FleetUdpReceiver(UdpTelemetryReceiver):
+    def __init__(self, state, host=UDP_HOST, port=FLEET_UDP_PORT):
+        super().__init__(state, host, port)
+
+    def handle(self, data):
+        parsed = parse_packet(data)
+        if parsed is None:
+            self.bad_packets += 1
+            return 0
+        robot_id, seq, records = parsed
+        if not len(records):
+            return 0
+        self.packets += 1
+        self.samples += len(records)
+        self.buffer.update([robot_id], recfunctions.structured_to_unstructured(records[-1:], dtype=np.float64))
+        return len(records)
+
+
+# Симулированный парк: FleetSimulator обновляет всех роботов одним шагом
+class FleetSimulatorFeed:
+    def __init__(self, state, n_robots=FLEET_SIZE, rate_hz=FLEET_RATE_HZ, simulator=None):
+        self.state = state
+        self.rate_hz = rate_hz
+        self.simulator = simulator or FleetSimulator(n_robots)
+        self._ids = np.arange(DASHBOARD_ROBOT + 1, DASHBOARD_ROBOT + 1 + self.simulator.n_robots)
+        self._rows = np.zeros((self.simulator.n_robots, len(CHANNELS)))
+        self._running = False
+        self._thread = None
+
+    def step(self, dt):
+        data = self.simulator.update(dt)
+        rows = self._rows
+        rows[:, CHANNEL_INDEX['time']] = self.simulator.time
+        rows[:, CHANNEL_INDEX['motor_temp']] = data['temp']
+        for name in ('vibration', 'load', 'left_slip', 'right_slip', 'voltage', 'current', 'capacity',
+                     'charge_percent'):
+            rows[:, CHANNEL_INDEX[name]] = data[name]
+        self.state.update(self._ids, rows)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="fleet-simulator")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        while self._running:
+            self.step(period)
+            time.sleep(period)
+
+
+# Переходы предупреждений роботов парка в журнал (alert_log.AlertEventLog) с их id.
+# Каждое обновление общего состояния — один отсчет для AlertEngine сразу по всем роботам;
+# работает в процессе-писателе, как и AlertEventRecorder
+class FleetAlertRecorder:
+    def __init__(self, state, log, rate_hz=FLEET_RATE_HZ, exclude=(DASHBOARD_ROBOT,)):
+        self.state = state
+        self.log = log
+        self.rate_hz = rate_hz
+        self.exclude = set(exclude)
+        self.engine = AlertEngine((state.capacity,), rate_hz=rate_hz)
+        self._columns = self.engine.rules.columns(CHANNELS)
+        self._seq = None
+        # Роботы, чьи события от прошлого запуска уже закрыты
+        self._known = set()
+        self._running = False
+        self._thread = None
+
+    def poll(self):
+        seq = self.state.seq
+        if seq == self._seq:
+            return
+        self._seq = seq
+        ids, seen, values = self.state.snapshot()
+        # Строка движка — слот робота в общем состоянии; пустые слоты (NaN) не срабатывают никогда
+        rows = np.full((self.state.capacity, len(self._columns)), np.nan)
+        rows[:len(ids)] = values[:, self._columns]
+        previous = self.engine.severity
+        severity = self.engine.update(rows[None])[0]
+        for robot in set(ids.tolist()) - self._known:
+            if robot not in self.exclude:
+                self.log.close_stale(robot)
+            self._known.add(robot)
+        # Переходы редки: цикл только по изменившимся правилам
+        for slot, rule in zip(*np.nonzero(severity != previous)):
+            robot = int(ids[slot])
+            if robot in self.exclude:
+                continue
+            self.log.transition(robot, int(rule), int(severity[slot, rule]), float(seen[slot]),
+                                float(rows[slot, rule]))
+        self.log.flush()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="fleet-alert-recorder")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        while self._running:
+            self.poll()
+            time.sleep(period)
+
+
+# Сводка по парку за один векторный проход по состоянию всех роботов.
+# Результат кэшируется до следующего обновления состояния, поэтому любое число
+# открытых страниц обходится одной агрегацией на обновление
+class FleetAggregator:
+    def __init__(self, state, rules=None, stale=FLEET_STALE_SECONDS):
+        self.state = state
+        self.rules = rules or CompiledRules()
+        self.stale = stale
+        self._columns = self.rules.columns(CHANNELS)
+        self._lock = threading.Lock()
+        self._cached = None
+        # Ключ кэша: номер обновления состояния и секунда (недоступность зависит от текущего времени)
+        self._key = None
+
+    def aggregate(self):
+        key = (self.state.seq, int(time.time()))
+        with self._lock:
+            if self._key != key:
+                self._cached = self._aggregate()
+                self._key = key
+            return self._cached
+
+    def _aggregate(self):
+        ids, seen, values = self.state.snapshot()
+        now = time.time()
+        online = now - seen <= self.stale
+        severity = self.rules.evaluate(values[:, self._columns])
+        worst = severity.max(axis=1) if len(values) else np.zeros(0, dtype=np.int8)
+        status = np.where(online, worst, STATUS_OFFLINE).astype(np.int64)
+        counts = np.bincount(status, minlength=len(STATUS_NAMES))
+
+        charge = values[:, CHANNEL_INDEX['charge_percent']]
+        temp = values[:, CHANNEL_INDEX['motor_temp']]
+        summary = {
+            'robots': len(ids),
+            'counts': dict(zip(STATUS_NAMES, counts.tolist())),
+            'min_battery': None,
+            'max_temp': None
+        }
+        # Экстремумы — только по роботам на связи: у недоступных значения устарели
+        if online.any():
+            i = int(np.argmin(np.where(online, charge, np.inf)))
+            summary['min_battery'] = {'robot': int(ids[i]), 'value': float(charge[i])}
+            i = int(np.argmax(np.where(online, temp, -np.inf)))
+            summary['max_temp'] = {'robot': int(ids[i]), 'value': float(temp[i])}
+
+        # Худшие сверху, при равенстве — по id
+        order = np.lexsort((ids, -STATUS_RANK[status]))
+        return {
+            'summary': summary,
+            'order': order,
+            'ids': ids,
+            'status': status,
+            'age': now - seen,
+            'values': values
+        }
+
+    def page(self, offset=0, limit=FLEET_PAGE_SIZE, statuses=None):
+        """Сводка и строки [offset, offset + limit) упорядоченной таблицы; statuses — фильтр по STATUS_NAMES.
+
+        Возвращает (сводка, строки, всего строк после фильтра)
+        """
+        result = self.aggregate()
+        order = result['order']
+        if statuses is not None:
+            codes = [STATUS_NAMES.index(name) for name in statuses if name in STATUS_NAMES]
+            order = order[np.isin(result['status'][order], codes)]
+        limit = max(1, min(limit, MAX_FLEET_PAGE_SIZE))
+        # В строки превращается только видимая страница
+        visible = order[offset:offset + limit]
+        values = result['values'][visible]
+        rows = [
+            {
+                'robot': robot,
+                'status': STATUS_NAMES[status],
+                'motor_temp': round(row[CHANNEL_INDEX['motor_temp']], 1),
+                'vibration': round(row[CHANNEL_INDEX['vibration']], 2),
+                'voltage': round(row[CHANNEL_INDEX['voltage']], 1),
+                'current': round(row[CHANNEL_INDEX['current']], 1),
+                'slip': round(max(row[CHANNEL_INDEX['left_slip']], row[CHANNEL_INDEX['right_slip']]), 2),
+                'charge_percent': round(row[CHANNEL_INDEX['charge_percent']], 1),
+                'age': round(age, 1)
+            }
+            for robot, status, age, row in zip(result['ids'][visible].tolist(), result['status'][visible].tolist(),
+                                               result['age'][visible].tolist(), values.tolist())
+        ]
+        return result['summary'], rows, len(order)
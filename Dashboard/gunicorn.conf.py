@@ -0,0 +1,9 @@
+# Запуск дашборда: gunicorn -c gunicorn.conf.py real_time_dash:server
+# Каждая открытая вкладка держит один поток воркера на /telemetry/stream (Server-Sent Events),
+# поэтому воркеры — с потоками: синхронные заняли бы вкладки целиком, и callback'и встали бы
+bind = '0.0.0.0:8050'
+# Несколько процессов делят телеметрию через shared_state.SharedTelemetryBuffer
+workers = 4
+worker_class = 'gthread'
+# Потоков на воркер: открытые вкладки плюс запас на callback'и и /fleet/
+threads = 32
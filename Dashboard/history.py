@@ -0,0 +1,303 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Каналы, сохраняемые в историю (имена — как в telemetry.CHANNELS)
+HISTORY_CHANNELS = (
+    'motor_temp',
+    'vibration',
+    'voltage',
+    'current',
+    'left_slip',
+    'right_slip',
+    'roll',
+    'pitch',
+    'yaw'
+)
+
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history')
+# В историю пишется каждый N-й отсчет: при 100 Гц это 10 Гц, неделя ≈ 24 МБ на канал
+HISTORY_DECIMATION = 10
+# Шаг роста файлов (в отсчетах), чтобы не расширять их на каждой записи
+GROWTH_CHUNK = 1 << 16
+
+# Уровни сводок: блоки по 64, 4096 и 262144 отсчета хранят min/max/сумму.
+# Запрос диапазона читает сводки, а не исходный ряд
+LEVEL_FACTOR = 64
+LEVELS = 3
+
+
+def lttb(x, y, points):
+    """Прореживание Largest-Triangle-Three-Buckets до points точек"""
+    n = len(x)
+    if points >= n or points < 3:
+        return x, y
+    # Границы корзин для внутренних точек (первая и последняя сохраняются)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Средние точки корзин нужны как третья вершина треугольника
+    counts = np.diff(edges)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        ax, ay = x[prev], y[prev]
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+    return x[selected], y[selected]
+
+
+# Колоночное хранилище истории: по одному memory-mapped файлу на канал, только дозапись
+class HistoryStore:
+    def __init__(self, path=HISTORY_DIR, channels=HISTORY_CHANNELS):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta = self._read_meta()
+        self.channels = tuple(meta.get('channels', channels))
+        self.count = meta.get('count', 0)
+        # Размеры блоков уровней в отсчетах; неполные блоки досчитываются из сырых данных
+        self.block_sizes = [LEVEL_FACTOR ** (level + 1) for level in range(LEVELS)]
+        self._lock = threading.Lock()
+        self._time = self._open('time.f64', np.float64, 1)
+        self._raw = {ch: self._open(f"{ch}.f32", np.float32, 1) for ch in self.channels}
+        # Сводки уровня: столбцы min, max, sum
+        self._levels = [
+            {ch: self._open(f"{ch}.L{level + 1}.f32", np.float32, 3) for ch in self.channels}
+            for level in range(LEVELS)
+        ]
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_meta(self):
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'channels': list(self.channels), 'count': self.count}, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+    def _open(self, name, dtype, width):
+        filename = os.path.join(self.path, name)
+        itemsize = np.dtype(dtype).itemsize * width
+        if not os.path.exists(filename) or os.path.getsize(filename) < itemsize:
+            with open(filename, 'wb') as f:
+                f.truncate(GROWTH_CHUNK * itemsize)
+        rows = os.path.getsize(filename) // itemsize
+        shape = (rows,) if width == 1 else (rows, width)
+        return np.memmap(filename, dtype=dtype, mode='r+', shape=shape)
+
+    def _remap(self, column, needed):
+        """Отображает файл столбца заново, если его дорастил другой процесс"""
+        if len(column) >= needed:
+            return column
+        width = 1 if column.ndim == 1 else column.shape[1]
+        rows = os.path.getsize(column.filename) // (column.dtype.itemsize * width)
+        shape = (rows,) if width == 1 else (rows, width)
+        return np.memmap(column.filename, dtype=column.dtype, mode='r+', shape=shape)
+
+    def _refresh(self):
+        """Подхватывает отсчеты, дописанные другим процессом (count — из meta.json)"""
+        count = self._read_meta().get('count', 0)
+        if count <= self.count:
+            return
+        self._time = self._remap(self._time, count)
+        for ch in self.channels:
+            self._raw[ch] = self._remap(self._raw[ch], count)
+            for level, block in enumerate(self.block_sizes):
+                self._levels[level][ch] = self._remap(self._levels[level][ch], count // block)
+        self.count = count
+
+    def _ensure(self, column, needed):
+        """Расширяет файл столбца, если в нем меньше needed строк"""
+        if len(column) >= needed:
+            return column
+        rows = max(needed, len(column) * 2, GROWTH_CHUNK)
+        width = 1 if column.ndim == 1 else column.shape[1]
+        column.flush()
+        filename = column.filename
+        with open(filename, 'r+b') as f:
+            f.truncate(rows * column.dtype.itemsize * width)
+        shape = (rows,) if width == 1 else (rows, width)
+        return np.memmap(filename, dtype=column.dtype, mode='r+', shape=shape)
+
+    def __len__(self):
+        return self.count
+
+    def append(self, times, columns):
+        """Дописывает отсчеты: times — метки времени, columns — канал -> массив значений"""
+        times = np.asarray(times, dtype=np.float64)
+        n = len(times)
+        if n == 0:
+            return
+        with self._lock:
+            # После смены писателя запись продолжается с конца, а не с count на момент открытия
+            self._refresh()
+            start, end = self.count, self.count + n
+            self._time = self._ensure(self._time, end)
+            self._time[start:end] = times
+            for ch in self.channels:
+                self._raw[ch] = self._ensure(self._raw[ch], end)
+                self._raw[ch][start:end] = columns[ch]
+            self._update_levels(start, end)
+            self.count = end
+
+    def _update_levels(self, start, end):
+        # Сворачиваются только блоки, завершенные этой записью
+        for level, block in enumerate(self.block_sizes):
+            first, last = start // block, end // block
+            if first == last:
+                break
+            for ch in self.channels:
+                summary = self._levels[level][ch] = self._ensure(self._levels[level][ch], last)
+                if level == 0:
+                    src = self._raw[ch][first * block:last * block].reshape(-1, block)
+                    summary[first:last, 0] = src.min(axis=1)
+                    summary[first:last, 1] = src.max(axis=1)
+                    summary[first:last, 2] = src.sum(axis=1, dtype=np.float64)
+                else:
+                    src = self._levels[level - 1][ch][first * LEVEL_FACTOR:last * LEVEL_FACTOR]
+                    src = src.reshape(-1, LEVEL_FACTOR, 3)
+                    summary[first:last, 0] = src[:, :, 0].min(axis=1)
+                    summary[first:last, 1] = src[:, :, 1].max(axis=1)
+                    summary[first:last, 2] = src[:, :, 2].sum(axis=1, dtype=np.float64)
+
+    def flush(self):
+        with self._lock:
+            self._time.flush()
+            for ch in self.channels:
+                self._raw[ch].flush()
+                for level in self._levels:
+                    level[ch].flush()
+            self._write_meta()
+
+    def index_range(self, start=None, end=None):
+        """Индексы [i0, i1) отсчетов с временем в [start, end]; бинарный поиск по меткам"""
+        # Писать может другой процесс: число отсчетов перечитывается при каждом запросе
+        self._refresh()
+        times = self._time[:self.count]
+        i0 = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        i1 = self.count if end is None else int(np.searchsorted(times, end, side='right'))
+        return i0, i1
+
+    def _segments(self, channel, i0, i1, points):
+        """Элементы диапазона: (индекс начала, min, max, сумма, число отсчетов).
+
+        Полные блоки берутся из самого крупного уровня, где их не меньше points,
+        неполные края — из сырых данных (их не больше двух блоков)
+        """
+        level = -1
+        for candidate, block in enumerate(self.block_sizes):
+            if (i1 - i0) // block >= points:
+                level = candidate
+        raw = self._raw[channel]
+        if level < 0:
+            values = np.asarray(raw[i0:i1], dtype=np.float64)
+            ones = np.ones(len(values))
+            return np.arange(i0, i1), values, values, values, ones
+
+        block = self.block_sizes[level]
+        b0, b1 = -(-i0 // block), i1 // block
+        summary = np.asarray(self._levels[level][channel][b0:b1], dtype=np.float64)
+        head = np.asarray(raw[i0:b0 * block], dtype=np.float64)
+        tail = np.asarray(raw[b1 * block:i1], dtype=np.float64)
+        index = np.concatenate([np.arange(i0, b0 * block),
+                                np.arange(b0, b1) * block,
+                                np.arange(b1 * block, i1)])
+        low = np.concatenate([head, summary[:, 0], tail])
+        high = np.concatenate([head, summary[:, 1], tail])
+        total = np.concatenate([head, summary[:, 2], tail])
+        count = np.concatenate([np.ones(len(head)), np.full(b1 - b0, block), np.ones(len(tail))])
+        return index, low, high, total, count
+
+    def query(self, channel, start=None, end=None, points=500, mode='minmax'):
+        """Ряд канала за интервал времени, прореженный до points точек.
+
+        mode='minmax' — огибающая min/max по points корзинам,
+        mode='lttb' — LTTB по средним значениям блоков
+        """
+        with self._lock:
+            i0, i1 = self.index_range(start, end)
+            if i1 <= i0:
+                empty = np.empty(0)
+                if mode == 'lttb':
+                    return {'time': empty, 'value': empty}
+                return {'time': empty, 'min': empty, 'max': empty}
+            index, low, high, total, count = self._segments(channel, i0, i1, points)
+            times = np.asarray(self._time[index])
+
+        if mode == 'lttb':
+            return dict(zip(('time', 'value'), lttb(times, total / count, points)))
+
+        # Корзины равной длины в пространстве индексов; элементы уже отсортированы
+        edges = np.linspace(i0, i1, min(points, len(index)) + 1)[:-1]
+        starts = np.unique(np.searchsorted(index, edges, side='left'))
+        starts = starts[starts < len(index)]
+        return {
+            'time': times[starts],
+            'min': np.minimum.reduceat(low, starts),
+            'max': np.maximum.reduceat(high, starts)
+        }
+
+
+# Переносит новые отсчеты из кольцевого буфера телеметрии в HistoryStore
+class HistoryWriter:
+    def __init__(self, buffer, channels, store=None, decimation=HISTORY_DECIMATION, interval=1.0):
+        self.buffer = buffer
+        self.store = store or HistoryStore()
+        self.decimation = decimation
+        self.interval = interval
+        self._time_column = channels.index('time')
+        self._columns = {ch: channels.index(ch) for ch in self.store.channels}
+        self._count = buffer.count
+        # Время симуляции переводится в Unix-время по моменту запуска
+        self._time_offset = None
+        self._running = False
+        self._thread = None
+
+    def write_pending(self):
+        rows, self._count = self.buffer.since(self._count)
+        if not len(rows):
+            return
+        # Сохраняются отсчеты с общим номером, кратным decimation, независимо от границ пакетов
+        first = self._count - len(rows)
+        rows = rows[(-first) % self.decimation::self.decimation]
+        if not len(rows):
+            return
+        if self._time_offset is None:
+            self._time_offset = time.time() - rows[-1, self._time_column]
+        self.store.append(rows[:, self._time_column] + self._time_offset,
+                          {ch: rows[:, i] for ch, i in self._columns.items()})
+        self.store.flush()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._count = self.buffer.count
+        self._thread = threading.Thread(target=self._run, daemon=True, name="history-writer")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self.write_pending()
+
+    def _run(self):
+        while self._running:
+            time.sleep(self.interval)
+            self.write_pending()
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+
+# Частота опроса IMU и постоянная времени комплементарного фильтра, секунды:
+# быстрее нее углы берутся из гироскопа, медленнее — из акселерометра
+IMU_RATE_HZ = 200.0
+COMPLEMENTARY_TAU = 0.5
+# Длина участка блока, на котором фильтр решается в замкнутой форме
+# (произведение коэффициентов на участке не должно уходить в ноль)
+FILTER_CHUNK = 256
+
+
+def accel_attitude(accel):
+    """Крен и тангаж (рад) по направлению силы тяжести; accel — (..., 3)"""
+    ax, ay, az = accel[..., 0], accel[..., 1], accel[..., 2]
+    return np.arctan2(ay, az), np.arctan2(-ax, np.hypot(ay, az))
+
+
+def euler_rates(gyro, roll, pitch):
+    """Угловая скорость в осях корпуса -> скорости крена, тангажа, рыскания"""
+    p, q, r = gyro[..., 0], gyro[..., 1], gyro[..., 2]
+    sin_r, cos_r = np.sin(roll), np.cos(roll)
+    # Вблизи вертикального тангажа рыскание не определено; наземный робот туда не попадает
+    cos_p = np.maximum(np.cos(pitch), 1e-6)
+    turn = q * sin_r + r * cos_r
+    return np.stack([p + turn * np.tan(pitch), q * cos_r - r * sin_r, turn / cos_p], axis=-1)
+
+
+def first_order_filter(alpha, inputs, state):
+    """x[k] = alpha[k] * x[k-1] + inputs[k] по оси 0 без цикла по отсчетам.
+
+    Решение x[k] = A[k] * (x0 + sum(inputs[j] / A[j])), где A — накопленное произведение alpha
+    """
+    gains = np.cumprod(alpha, axis=0)
+    return gains * (state + np.cumsum(inputs / gains, axis=0))
+
+
+# Оценка ориентации комплементарным фильтром: крен и тангаж — интеграл гироскопа,
+# подтянутый к углам по акселерометру; рыскание — интеграл гироскопа (магнитометра нет).
+# Фильтр линейный, поэтому блок отсчетов обрабатывается векторно; ось 0 — время,
+# остальные (например, роботы) задаются shape
+class AttitudeEstimator:
+    def __init__(self, shape=(), tau=COMPLEMENTARY_TAU):
+        self.tau = tau
+        # Углы (крен, тангаж, рыскание) в радианах после последнего отсчета
+        self.angles = np.zeros(tuple(shape) + (3,))
+        self.time = None
+        self._initialized = False
+
+    def reset(self, angles=None, time=None):
+        self.angles = np.zeros_like(self.angles) if angles is None else np.asarray(angles, dtype=float)
+        self.time = time
+        self._initialized = angles is not None
+
+    def update(self, times, gyro, accel):
+        """Обрабатывает блок: times — (n,), gyro и accel — (n, *shape, 3); возвращает углы (n, *shape, 3)"""
+        times = np.asarray(times, dtype=float)
+        if not len(times):
+            return np.empty((0,) + self.angles.shape)
+        gyro = np.asarray(gyro, dtype=float)
+        accel_roll, accel_pitch = accel_attitude(np.asarray(accel, dtype=float))
+        if not self._initialized:
+            # Первый отсчет: наклон сразу берется из акселерометра
+            self.angles[..., 0], self.angles[..., 1] = accel_roll[0], accel_pitch[0]
+            self._initialized = True
+        previous = times[0] - 1.0 / IMU_RATE_HZ if self.time is None else self.time
+        dt = np.diff(times, prepend=previous)
+        dt = np.maximum(dt, 0).reshape((-1,) + (1,) * (gyro.ndim - 2))
+        rates = euler_rates(gyro, accel_roll, accel_pitch)
+
+        result = np.empty(gyro.shape)
+        # Рыскание: накопленная сумма приращений
+        result[..., 2] = self.angles[..., 2] + np.cumsum(rates[..., 2] * dt, axis=0)
+        # Крен и тангаж: x[k] = a * (x[k-1] + ω·dt) + (1 - a) * угол по акселерометру
+        alpha = self.tau / (self.tau + dt)
+        measured = np.stack([accel_roll, accel_pitch], axis=-1)
+        inputs = alpha[..., None] * rates[..., :2] * dt[..., None] + (1 - alpha[..., None]) * measured
+        state = self.angles[..., :2]
+        for start in range(0, len(times), FILTER_CHUNK):
+            part = slice(start, start + FILTER_CHUNK)
+            block = first_order_filter(np.broadcast_to(alpha[part, ..., None], inputs[part].shape),
+                                       inputs[part], state)
+            result[part, ..., :2] = block
+            state = block[-1]
+
+        self.angles = result[-1].copy()
+        # Рыскание хранится в пределах одного оборота, чтобы не терять точность
+        self.angles[..., 2] = math.tau * ((self.angles[..., 2] / math.tau) % 1.0)
+        self.time = float(times[-1])
+        return result
@@ -0,0 +1,233 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from shared_state import SHARED_DIR
+
+# Границы корзин гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Как часто процесс многопроцессного сервера сохраняет снимок своих метрик, секунды
+SNAPSHOT_INTERVAL = 1.0
+
+# Все метрики процесса; отдаются на /metrics
+REGISTRY = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+# Базовая метрика: значения хранятся по кортежу значений меток
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labels=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def snapshot(self):
+        """Копия значений для сохранения в JSON: список пар [значения меток, значение]"""
+        with self._lock:
+            return [[list(key), self._copy_value(value)] for key, value in sorted(self._values.items())]
+
+    def _copy_value(self, value):
+        return value
+
+    def _render_value(self, key, value, extra=()):
+        return [f"{self.name}{_format_labels(self.label_names, key, extra)} {value}"]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labels, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Счетчики по корзинам (последняя — +Inf), сумма, количество
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, func):
+        """Декоратор: наблюдает время выполнения каждого вызова func"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.time():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def _copy_value(self, value):
+        return [value[0][:], value[1], value[2]]
+
+    def _render_value(self, key, value, extra=()):
+        counts, total, count = value[0][:], value[1], value[2]
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            labels = _format_labels(self.label_names, key, tuple(extra) + (('le', le),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.label_names, key, extra)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.label_names, key, extra)} {count}")
+        return lines
+
+
+def render(registry=REGISTRY):
+    """Текст в формате Prometheus для всех метрик реестра"""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Метрики многопроцессного сервера (воркеры gunicorn): каждый процесс раз в interval сохраняет
+# снимок своих значений в общий каталог, и /metrics любого воркера отдает значения всех процессов
+# с меткой pid. Значения не суммируются: счетчик каждого процесса только растет, поэтому rate()
+# в Prometheus работает при любом воркере, ответившем на опрос; суммы по парку — sum without (pid)
+class MultiprocessCollector:
+    def __init__(self, name, registry=REGISTRY, directory=SHARED_DIR, interval=SNAPSHOT_INTERVAL):
+        self.directory = os.path.join(directory, f"robot_metrics_{name}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.registry = registry
+        self.interval = interval
+        # Процесс, в котором запущен поток снимков: после fork поток нужно запустить заново
+        self._pid = None
+        # Снимок пишут поток снимков и обработчик /metrics, временный файл у них общий
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, daemon=True, name="metrics-snapshot").start()
+
+    def _run(self):
+        while True:
+            self.write()
+            time.sleep(self.interval)
+
+    def write(self):
+        """Сохраняет снимок метрик этого процесса; файл заменяется целиком, читатели не видят половину"""
+        snapshot = {metric.name: metric.snapshot() for metric in self.registry}
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with self._lock:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(path + '.tmp', path)
+
+    def _snapshots(self):
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                pid = int(name[:-len('.json')])
+            except ValueError:
+                continue
+            path = os.path.join(self.directory, name)
+            # Снимки завершившихся процессов удаляются: их ряды в Prometheus просто прекращаются
+            if not _pid_alive(pid):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append((pid, json.load(f)))
+            except (FileNotFoundError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        """Текст в формате Prometheus со значениями всех процессов"""
+        # Свой снимок обновляется перед чтением, значения ответившего процесса всегда свежие
+        self.write()
+        snapshots = self._snapshots()
+        lines = []
+        for metric in self.registry:
+            lines.extend(metric.header())
+            for pid, snapshot in snapshots:
+                for key, value in snapshot.get(metric.name, ()):
+                    lines.extend(metric._render_value(tuple(key), value, (('pid', pid),)))
+        return '\n'.join(lines) + '\n'
@@ -1,38 +1,32 @@
 import dash
-from dash import dcc, html, Input, Output, State
+from dash import dcc, html, dash_table, Input, Output, State, Patch, no_update
 import dash_bootstrap_components as dbc
 from dash.exceptions import PreventUpdate
-import random
-import base64
 import math
-import time
-from collections import deque
+import json
+import os
+import uuid
+
+from flask import Response, request, jsonify, abort
+
+import metrics
+from dash_delta import DeltaTracker
+from alerts import TelemetryAlertMonitor, SEVERITY_COLORS
+from alert_log import AlertEventLog, AlertEventRecorder, DEFAULT_PAGE_SIZE
+from analytics import TelemetryAnalytics
+from fleet import (SharedFleetState, FleetAggregator, FleetAlertRecorder, FleetUdpReceiver, FleetSimulatorFeed,
+                   FLEET_PAGE_SIZE, STATUS_NAMES)
+from history import HistoryStore, HistoryWriter
+from telemetry_push import TelemetryPublisher, PUSH_RATE_HZ
+from shared_state import SharedTelemetryBuffer, WriterElection
+from udp_ingest import UdpTelemetryReceiver
+from recorder import (RECORDING_DIR, TELEMETRY_LOG, RecordingWriter, RecordingReader, ReplayClock,
+                      TelemetryRecorder, TelemetryReplay)
+from telemetry import TelemetryAcquisition, CHANNELS, SAMPLE_RATE_HZ, HISTORY_SECONDS
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
-
-# Пределы параметров
-PARAM_LIMITS = {
-    'motor_temp': {'warn': 70, 'critical': 85},
-    'vibration': {'warn': 0.15, 'critical': 0.25},
-    'battery_voltage': {'warn': 22, 'critical': 20},
-    'current': {'warn': 5, 'critical': 7},
-    'wheel_slip': {'warn': 0.2, 'critical': 0.3}
-}
-
-# Приоритеты сообщений
-ALERT_PRIORITY = {
-    'critical_temp': 50,
-    'critical_vibration': 45,
-    'critical_voltage': 40,
-    'critical_current': 40,
-    'critical_slip': 55,
-    'warn_temp': 30,
-    'warn_vibration': 25,
-    'warn_voltage': 20,
-    'warn_current': 20,
-    'warn_slip': 35,
-    'normal': 0
-}
+# WSGI-приложение для gunicorn: real_time_dash:server
+server = app.server
 
 # Стили
 CARD_STYLE = {
@@ -76,75 +70,105 @@ BATTERY_INDICATOR_STYLE = {
     }
 }
 
+# Источник телеметрии: 'simulator' — встроенные симуляторы, 'udp' — пакеты робота
+# (или robot_emulator.py) на порт udp_ingest.UDP_PORT, 'replay' — запись recorder.RECORDING_DIR
+TELEMETRY_SOURCE = 'simulator'
+# Запись потока телеметрии в recorder.RECORDING_DIR для разбора инцидентов
+RECORD_TELEMETRY = False
+
+# Обзор парка роботов на /fleet/: 'simulator' — симулятор парка (fleet.FleetSimulator),
+# 'udp' — пакеты роботов на порт fleet.FLEET_UDP_PORT; None — обзор выключен
+FLEET_SOURCE = 'simulator'
+
+# Обновление виджетов потоком /telemetry/stream вместо опроса dcc.Interval.
+# Поток занимает обработчик сервера, пока открыта вкладка, поэтому нужен воркер с потоками
+# или асинхронный (gunicorn -c gunicorn.conf.py: gthread). Синхронный воркер поток не отдает,
+# и страница переходит на опрос
+TELEMETRY_PUSH = True
+
+UPDATE_SECONDS = metrics.Histogram('dashboard_update_seconds', "Время callback'а update_data")
+FRAME_BUILD_SECONDS = metrics.Histogram('dashboard_frame_build_seconds', "Время построения кадра телеметрии")
+FLEET_UPDATE_SECONDS = metrics.Histogram('dashboard_fleet_update_seconds', "Время callback'а update_fleet")
+
+# Ключ WARNING_STYLE по коду важности предупреждения
+SEVERITY_STYLES = ('normal', 'warning', 'critical')
+
+# Адрес сервера видеопотока (camera_component.py) и потоки камер робота
+CAMERA_STREAM_URL = "http://localhost:8081/video_feed"
+CAMERA_STREAMS = {
+    'btn-front-cam': f"{CAMERA_STREAM_URL}/front",
+    'btn-rear-cam': f"{CAMERA_STREAM_URL}/rear"
+}
+
+# Цвет строки обзора парка по состоянию робота
+FLEET_STATUS_COLORS = {
+    'normal': '#00ff99',
+    'warning': 'orange',
+    'critical': 'red',
+    'offline': '#888888'
+}
+
 WARNING_STYLE = {
     'critical': {'color': 'red', 'fontWeight': 'bold'},
     'warning': {'color': 'orange'},
     'normal': {'color': '#00ff99'}
 }
 
-# Класс для имитации работы двигателя
-class MotorSimulator:
-    def __init__(self):
-        self.time = 0
-        self.temp = 25.0
-        self.load = 0.3
-        self.left_slip = 0.0
-        self.right_slip = 0.0
-
-    def update(self, dt):
-        self.time += dt
-        self.load = 0.3 + 0.5 * (0.5 + 0.5 * math.sin(self.time * 0.2))
-        temp_change = (self.load * 0.1 - 0.02) * dt
-        self.temp += temp_change
-        self.temp = max(25.0, min(self.temp, 95.0))
-        vibration = 0.05 + 0.15 * self.load + 0.03 * random.random()
-
-        # Имитация пробуксовки (значения теперь не превышают пределы слишком часто)
-        slip_change = random.uniform(-0.02, 0.03)
-        self.left_slip = max(0, min(0.35, self.left_slip + slip_change))
-        self.right_slip = max(0, min(0.35, self.right_slip + slip_change))
-
-        return {
-            'temp': self.temp,
-            'vibration': vibration,
-            'load': self.load,
-            'left_slip': self.left_slip,
-            'right_slip': self.right_slip
-        }
-
-
-# Класс для имитации батареи
-class BatterySimulator:
-    def __init__(self):
-        self.voltage = 24.8
-        self.capacity = 3000
-        self.max_capacity = 5000
-
-    def update(self, current, dt):
-        self.capacity -= current * 1000 * dt / 3600
-        self.capacity = max(0, self.capacity)
-        charge_percent = self.capacity / self.max_capacity * 100
-        base_voltage = 24.0 * (charge_percent / 100.0)
-        # Уменьшил падение напряжения, чтобы оно реже опускалось ниже предупреждений
-        voltage_drop = 10
-        self.voltage = base_voltage - voltage_drop
-
-        return {
-            'voltage': self.voltage,
-            'capacity': self.capacity,
-            'charge_percent': charge_percent
-        }
-
-
-# Глобальные объекты симуляторов
-motor = MotorSimulator()
-battery = BatterySimulator()
-
-# Имитация пройденного расстояния и скорости
-distance = 0.0
-speed = 0.0
-
-app.layout = dbc.Container(
+# Сбор телеметрии идет в отдельном потоке; callback только читает кольцевой буфер.
+# Буфер лежит в общей памяти, поэтому все воркеры показывают одно состояние робота
+telemetry = SharedTelemetryBuffer(int(SAMPLE_RATE_HZ * HISTORY_SECONDS))
+acquisition = TelemetryAcquisition(telemetry, rate_hz=SAMPLE_RATE_HZ)
+alert_monitor = TelemetryAlertMonitor(telemetry, CHANNELS)
+# Скользящая статистика и тренды: прогнозы выхода за пределы до их срабатывания
+analytics = TelemetryAnalytics(telemetry, CHANNELS)
+# История телеметрии для графиков трендов; на диск ее пишет только процесс-писатель (start_writer)
+history_store = HistoryStore()
+# Журнал предупреждений: пишет процесс-писатель, читают все
+alert_log = AlertEventLog()
+# Последние отсчеты всех роботов парка и сводка по ним
+fleet_state = SharedFleetState() if FLEET_SOURCE else None
+fleet_aggregator = FleetAggregator(fleet_state) if FLEET_SOURCE else None
+
+
+# Воспроизведение записи; переход и скорость задаются через /replay
+replay = None
+if TELEMETRY_SOURCE == 'replay':
+    replay = TelemetryReplay(RecordingReader(os.path.join(RECORDING_DIR, TELEMETRY_LOG)),
+                             telemetry, ReplayClock())
+
+
+def start_writer():
+    # Датчики опрашивает и историю пишет только один процесс
+    if FLEET_SOURCE == 'udp':
+        FleetUdpReceiver(fleet_state).start()
+    elif FLEET_SOURCE:
+        FleetSimulatorFeed(fleet_state).start()
+    if FLEET_SOURCE:
+        # Предупреждения роботов парка попадают в тот же журнал со своими id
+        FleetAlertRecorder(fleet_state, alert_log).start()
+    if replay is not None:
+        # Воспроизводимые данные в историю и в запись не попадают
+        replay.start()
+        return
+    if TELEMETRY_SOURCE == 'udp':
+        UdpTelemetryReceiver(telemetry).start()
+    else:
+        # Симуляция продолжается с последнего отсчета в общем буфере
+        last_sample = telemetry.latest()
+        if last_sample is not None:
+            acquisition.resume(last_sample)
+        acquisition.start()
+    if RECORD_TELEMETRY:
+        TelemetryRecorder(telemetry, RecordingWriter(os.path.join(RECORDING_DIR, TELEMETRY_LOG))).start()
+    # Хранилище открывается заново: с момента импорта историю мог дописывать прежний писатель
+    HistoryWriter(telemetry, CHANNELS, HistoryStore()).start()
+    AlertEventRecorder(telemetry, CHANNELS, alert_log).start()
+
+
+WriterElection(telemetry, start_writer).start()
+delta_tracker = DeltaTracker()
+
+dashboard_layout = dbc.Container(
     fluid=True,
     style={'backgroundColor': '#121212', 'padding': '20px', 'height': '100vh'},
     children=[
@@ -253,7 +277,7 @@ app.layout = dbc.Container(
                             dbc.CardBody([
                                 html.Img(
                                     id="camera-view",
-                                    src="http://localhost:8081/video_feed",
+                                    src=CAMERA_STREAMS['btn-front-cam'],
                                     style={
                                         'width': '100%',
                                         'height': '400px',
@@ -319,149 +343,100 @@ app.layout = dbc.Container(
             ], md=4, style={'display': 'flex', 'flexDirection': 'column', 'height': 'calc(100vh - 100px)'})
         ], style={'height': 'calc(100vh - 100px)'}),
 
-        dcc.Interval(id='data-update', interval=1000),
+        # При push-обновлениях опрос выключен: интервал дает только первую отрисовку
+        dcc.Interval(id='data-update', interval=1000, disabled=TELEMETRY_PUSH),
         dcc.Store(id='sensor-data'),
+        dcc.Store(id='alert-severity'),
+        dcc.Store(id='telemetry-frame'),
+        html.Div(id='telemetry-push', **{'data-enabled': 'true' if TELEMETRY_PUSH else 'false'},
+                 style={'display': 'none'}),
         html.Div(id='dummy-output', style={'display': 'none'})
     ]
 )
 
 
-def create_alert_message(param, value):
-    """Создает сообщение об ошибке с приоритетом"""
-    if param == 'motor_temp':
-        if value > PARAM_LIMITS['motor_temp']['critical']:
-            return {
-                'message': f"КРИТИЧЕСКАЯ температура: {value:.1f}°C",
-                'color': 'danger',
-                'priority': ALERT_PRIORITY['critical_temp']
-            }
-        elif value > PARAM_LIMITS['motor_temp']['warn']:
-            return {
-                'message': f"Высокая температура: {value:.1f}°C",
-                'color': 'warning',
-                'priority': ALERT_PRIORITY['warn_temp']
-            }
-
-    elif param == 'vibration':
-        if value > PARAM_LIMITS['vibration']['critical']:
-            return {
-                'message': f"КРИТИЧЕСКАЯ вибрация: {value:.2f}g",
-                'color': 'danger',
-                'priority': ALERT_PRIORITY['critical_vibration']
-            }
-        elif value > PARAM_LIMITS['vibration']['warn']:
-            return {
-                'message': f"Высокая вибрация: {value:.2f}g",
-                'color': 'warning',
-                'priority': ALERT_PRIORITY['warn_vibration']
-            }
-
-    elif param == 'voltage':
-        if value < PARAM_LIMITS['battery_voltage']['critical']:
-            return {
-                'message': f"КРИТИЧЕСКОЕ напряжение: {value:.1f}V",
-                'color': 'danger',
-                'priority': ALERT_PRIORITY['critical_voltage']
-            }
-        elif value < PARAM_LIMITS['battery_voltage']['warn']:
-            return {
-                'message': f"Низкое напряжение: {value:.1f}V",
-                'color': 'warning',
-                'priority': ALERT_PRIORITY['warn_voltage']
-            }
-
-    elif param == 'current':
-        if value > PARAM_LIMITS['current']['critical']:
-            return {
-                'message': f"КРИТИЧЕСКИЙ ток: {value:.1f}A",
-                'color': 'danger',
-                'priority': ALERT_PRIORITY['critical_current']
-            }
-        elif value > PARAM_LIMITS['current']['warn']:
-            return {
-                'message': f"Высокий ток: {value:.1f}A",
-                'color': 'warning',
-                'priority': ALERT_PRIORITY['warn_current']
-            }
-
-    elif param == 'wheel_slip':
-        if value > PARAM_LIMITS['wheel_slip']['critical']:
-            return {
-                'message': f"КРИТИЧЕСКАЯ пробуксовка: {value:.2f}",
-                'color': 'danger',
-                'priority': ALERT_PRIORITY['critical_slip']
-            }
-        elif value > PARAM_LIMITS['wheel_slip']['warn']:
-            return {
-                'message': f"Пробуксовка: {value:.2f}",
-                'color': 'warning',
-                'priority': ALERT_PRIORITY['warn_slip']
-            }
-
-    return None
+def serve_layout():
+    # Каждая загрузка страницы получает свой id, по которому DeltaTracker помнит отправленное
+    return html.Div([dcc.Store(id='client-id', data=uuid.uuid4().hex), dashboard_layout])
 
 
-@app.callback(
-    [Output('motor-temp', 'children'),
-     Output('motor-temp', 'style'),
-     Output('vibration', 'children'),
+app.layout = serve_layout
+
+
+# Стили значений выбираются в браузере по кодам важности (порядок — как в ALERT_RULES)
+app.clientside_callback(
+    f"""
+    function(severity) {{
+        const styles = {json.dumps([WARNING_STYLE[name] for name in SEVERITY_STYLES])};
+        return (severity || [0, 0, 0, 0, 0, 0]).map(code => styles[code]);
+    }}
+    """,
+    [Output('motor-temp', 'style'),
      Output('vibration', 'style'),
-     Output('left-slip', 'children'),
-     Output('left-slip', 'style'),
-     Output('right-slip', 'children'),
-     Output('right-slip', 'style'),
-     Output('voltage', 'children'),
      Output('voltage', 'style'),
-     Output('current', 'children'),
      Output('current', 'style'),
-     Output('distance', 'children'),
-     Output('speed', 'children'),
-     Output('roll', 'children'),
-     Output('pitch', 'children'),
-     Output('yaw', 'children'),
-     Output('battery-level', 'style'),
-     Output('battery-text', 'children'),
-     Output('active-alerts-container', 'children'),
-     Output('alert-audio', 'autoPlay')],
-    Input('data-update', 'n_intervals')
+     Output('left-slip', 'style'),
+     Output('right-slip', 'style')],
+    Input('alert-severity', 'data')
 )
-def update_data(n):
-    global distance, speed
-
-    dt = 1.0
-    motor_data = motor.update(dt)
-    current = 2.0 + 3.0 * motor_data['load']
-    battery_data = battery.update(current, dt)
-    speed = 0.01 * (1200 + 50 * math.sin(n * 0.5))
-    distance += speed * dt
-    roll = 2.5 * math.sin(n * 0.1)
-    pitch = -1.2 * math.sin(n * 0.15)
-    yaw = n % 360
-
-    # Создаем все возможные сообщения
-    temp_alert = create_alert_message('motor_temp', motor_data['temp'])
-    vib_alert = create_alert_message('vibration', motor_data['vibration'])
-    volt_alert = create_alert_message('voltage', battery_data['voltage'])
-    curr_alert = create_alert_message('current', current)
-    left_slip_alert = create_alert_message('wheel_slip', motor_data['left_slip'])
-    right_slip_alert = create_alert_message('wheel_slip', motor_data['right_slip'])
-
-    # Собираем все сообщения в список
-    all_alerts = [alert for alert in [temp_alert, vib_alert, volt_alert, curr_alert,
-                                      left_slip_alert, right_slip_alert] if alert is not None]
-
-    # Сортируем по приоритету (сначала самые важные)
-    all_alerts.sort(key=lambda x: x['priority'], reverse=True)
-
-    # Берем 3 самых важных сообщения
-    top_alerts = all_alerts[:3]
-
-    # Проверяем, есть ли критические сообщения для звукового оповещения
-    play_alert = any(alert['color'] == 'danger' for alert in top_alerts)
-
-    # Создаем компоненты Alert
+
+
+# Элементы с текстовыми значениями телеметрии (порядок — как в build_frame)
+TEXT_OUTPUTS = (
+    'motor-temp',
+    'vibration',
+    'left-slip',
+    'right-slip',
+    'voltage',
+    'current',
+    'distance',
+    'speed',
+    'roll',
+    'pitch',
+    'yaw',
+    'battery-text'
+)
+
+
+@FRAME_BUILD_SECONDS.timed
+def build_frame():
+    """Готовит кадр отображения из последнего отсчета; None, если данных еще нет"""
+    sample = telemetry.latest()
+    if sample is None:
+        return None
+
+    # Все параметры проверяются одним проходом по таблице правил (с гистерезисом и антидребезгом)
+    values, severity = alert_monitor.poll()
+    top_alerts = alert_monitor.engine.rules.top_alerts(values, severity, k=3)
+    # Прогнозы конкурируют с предупреждениями за место в панели по приоритету
+    top_alerts = sorted(top_alerts + analytics.poll(), key=lambda alert: -alert['priority'])[:3]
+
+    return {
+        'texts': [
+            f"{sample['motor_temp']:.1f}°C",
+            f"{sample['vibration']:.2f}g",
+            f"{sample['left_slip']:.2f}",
+            f"{sample['right_slip']:.2f}",
+            f"{sample['voltage']:.1f}V",
+            f"{sample['current']:.1f}A",
+            f"{sample['distance']:.1f} м",
+            f"{sample['speed']:.1f} м/с",
+            f"{sample['roll']:.1f}°",
+            f"{sample['pitch']:.1f}°",
+            f"{sample['yaw']:.1f}°",
+            f"{sample['charge_percent']:.1f}%"
+        ],
+        'battery_width': f"{max(0.0, min(100.0, sample['charge_percent'])):.1f}%",
+        'severity': [int(code) for code in severity],
+        'alerts': [{'message': alert['message'], 'color': alert['color']} for alert in top_alerts],
+        # Проверяем, есть ли критические сообщения для звукового оповещения
+        'play_alert': any(alert['color'] == 'danger' for alert in top_alerts)
+    }
+
+
+def create_alert_components(alerts):
     alert_components = []
-    for alert in top_alerts:
+    for alert in alerts:
         alert_components.append(
             dbc.Alert(
                 alert['message'],
@@ -474,54 +449,318 @@ def update_data(n):
 
     if not alert_components:
         alert_components = [dbc.Alert("Все системы в норме", color="success", className="mb-2")]
+    return alert_components
 
-    # Определяем стили для значений
-    motor_temp_style = WARNING_STYLE['critical'] if temp_alert and temp_alert['color'] == 'danger' else \
-        WARNING_STYLE['warning'] if temp_alert and temp_alert['color'] == 'warning' else \
-            WARNING_STYLE['normal']
 
-    vibration_style = WARNING_STYLE['critical'] if vib_alert and vib_alert['color'] == 'danger' else \
-        WARNING_STYLE['warning'] if vib_alert and vib_alert['color'] == 'warning' else \
-            WARNING_STYLE['normal']
+@app.callback(
+    [Output(element_id, 'children') for element_id in TEXT_OUTPUTS]
+    + [Output('battery-level', 'style'),
+       Output('alert-severity', 'data'),
+       Output('active-alerts-container', 'children'),
+       Output('alert-audio', 'autoPlay')],
+    Input('data-update', 'n_intervals'),
+    State('client-id', 'data')
+)
+@UPDATE_SECONDS.timed
+def update_data(n, client_id):
+    frame = build_frame()
+    if frame is None:
+        raise PreventUpdate
+
+    texts = tuple(frame['texts'])
+    alerts_key = tuple((alert['message'], alert['color']) for alert in frame['alerts'])
+
+    # Отправляются только выходы, изменившиеся с прошлого ответа этому клиенту
+    changed = delta_tracker.changed(client_id, n, texts + (
+        frame['battery_width'], tuple(frame['severity']), alerts_key, frame['play_alert']))
+    outputs = [text if send else no_update for text, send in zip(texts, changed)]
+
+    if changed[12]:
+        # Меняется только ширина индикатора, остальной стиль остается в браузере
+        battery_level_style = Patch()
+        battery_level_style['width'] = frame['battery_width']
+        outputs.append(battery_level_style)
+    else:
+        outputs.append(no_update)
+
+    outputs.append(frame['severity'] if changed[13] else no_update)
+    outputs.append(create_alert_components(frame['alerts']) if changed[14] else no_update)
+    outputs.append(frame['play_alert'] if changed[15] else no_update)
+    return outputs
+
+
+# Кадры из потока /telemetry/stream применяются в браузере без запросов к серверу
+app.clientside_callback(
+    f"""
+    function(frame) {{
+        if (!frame) {{
+            return window.dash_clientside.no_update;
+        }}
+        const levelStyle = {json.dumps(BATTERY_INDICATOR_STYLE['level'])};
+        const alerts = frame.alerts.map(alert => ({{
+            namespace: 'dash_bootstrap_components',
+            type: 'Alert',
+            props: {{
+                children: alert.message,
+                color: alert.color,
+                className: 'mb-2',
+                style: {{borderLeft: alert.color === 'danger' ? '4px solid red' : '4px solid orange'}}
+            }}
+        }}));
+        if (!alerts.length) {{
+            alerts.push({{
+                namespace: 'dash_bootstrap_components',
+                type: 'Alert',
+                props: {{children: 'Все системы в норме', color: 'success', className: 'mb-2'}}
+            }});
+        }}
+        return frame.texts.concat([
+            Object.assign({{}}, levelStyle, {{width: frame.battery_width}}),
+            frame.severity,
+            alerts,
+            frame.play_alert
+        ]);
+    }}
+    """,
+    [Output(element_id, 'children', allow_duplicate=True) for element_id in TEXT_OUTPUTS]
+    + [Output('battery-level', 'style', allow_duplicate=True),
+       Output('alert-severity', 'data', allow_duplicate=True),
+       Output('active-alerts-container', 'children', allow_duplicate=True),
+       Output('alert-audio', 'autoPlay', allow_duplicate=True)],
+    Input('telemetry-frame', 'data'),
+    prevent_initial_call=True
+)
 
-    left_slip_style = WARNING_STYLE['critical'] if left_slip_alert and left_slip_alert['color'] == 'danger' else \
-        WARNING_STYLE['warning'] if left_slip_alert and left_slip_alert['color'] == 'warning' else \
-            WARNING_STYLE['normal']
 
-    right_slip_style = WARNING_STYLE['critical'] if right_slip_alert and right_slip_alert['color'] == 'danger' else \
-        WARNING_STYLE['warning'] if right_slip_alert and right_slip_alert['color'] == 'warning' else \
-            WARNING_STYLE['normal']
+@app.server.route('/telemetry/stream')
+def telemetry_stream():
+    """Server-Sent Events: каждый кадр телеметрии сериализуется один раз для всех подписчиков"""
+    # gthread, gevent и dev-сервер с потоками выставляют wsgi.multithread; синхронный воркер gunicorn — нет,
+    # и каждая открытая вкладка заняла бы его целиком
+    if not request.environ.get('wsgi.multithread'):
+        return Response("Поток телеметрии требует воркер с потоками (gthread)", status=503,
+                        mimetype='text/plain')
+    return Response(publisher.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-    voltage_style = WARNING_STYLE['critical'] if volt_alert and volt_alert['color'] == 'danger' else \
-        WARNING_STYLE['warning'] if volt_alert and volt_alert['color'] == 'warning' else \
-            WARNING_STYLE['normal']
 
-    current_style = WARNING_STYLE['critical'] if curr_alert and curr_alert['color'] == 'danger' else \
-        WARNING_STYLE['warning'] if curr_alert and curr_alert['color'] == 'warning' else \
-            WARNING_STYLE['normal']
+@app.callback(
+    [Output('camera-view', 'src'),
+     Output('btn-front-cam', 'active'),
+     Output('btn-rear-cam', 'active')],
+    [Input('btn-front-cam', 'n_clicks'),
+     Input('btn-rear-cam', 'n_clicks')],
+    prevent_initial_call=True
+)
+def switch_camera(front_clicks, rear_clicks):
+    """Переключает видеопоток между передней и задней камерой"""
+    button_id = dash.callback_context.triggered_id
+    if button_id not in CAMERA_STREAMS:
+        raise PreventUpdate
+    return CAMERA_STREAMS[button_id], button_id == 'btn-front-cam', button_id == 'btn-rear-cam'
+
+
+@app.server.route('/history')
+def history_query():
+    """Тренд канала: /history?channel=motor_temp&start=<unix>&end=<unix>&points=500&mode=minmax"""
+    store = history_store
+    channel = request.args.get('channel', 'motor_temp')
+    mode = request.args.get('mode', 'minmax')
+    if channel not in store.channels or mode not in ('minmax', 'lttb'):
+        abort(400)
+    points = max(3, min(5000, request.args.get('points', 500, type=int)))
+    result = store.query(channel, request.args.get('start', type=float),
+                         request.args.get('end', type=float), points, mode)
+    return jsonify({key: values.tolist() for key, values in result.items()})
+
+
+@app.server.route('/replay')
+def replay_control():
+    """Управление воспроизведением: /replay?seek=<unix>&speed=10; без параметров — состояние"""
+    if replay is None:
+        abort(404)
+    seek = request.args.get('seek', type=float)
+    speed = request.args.get('speed', type=float)
+    if seek is not None:
+        replay.clock.seek(min(max(seek, replay.reader.start_time), replay.reader.end_time))
+    if speed is not None:
+        replay.clock.set_speed(speed)
+    now, _ = replay.clock.now()
+    return jsonify({
+        'start': replay.reader.start_time,
+        'end': replay.reader.end_time,
+        'time': min(now, replay.reader.end_time),
+        'speed': replay.clock.speed
+    })
+
+
+@app.server.route('/alerts/events')
+def alert_events():
+    """Журнал предупреждений: /alerts/events?robot=0&parameter=wheel_slip&severity=critical
+    &start=<unix>&end=<unix>&limit=50&before=<id>; следующая страница — before=next из ответа"""
+    severity = request.args.get('severity')
+    if severity is not None:
+        codes = {color: code for code, color in SEVERITY_COLORS.items()}
+        codes.update({'warning': 1, 'critical': 2})
+        if severity.isdigit():
+            severity = int(severity)
+        elif severity in codes:
+            severity = codes[severity]
+        else:
+            abort(400)
+    events, next_page = alert_log.query(
+        robot=request.args.get('robot', type=int),
+        parameter=request.args.get('parameter'),
+        severity=severity,
+        start=request.args.get('start', type=float),
+        end=request.args.get('end', type=float),
+        limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+        before=request.args.get('before', type=int))
+    return jsonify({'events': events, 'next': next_page})
+
+
+# Обзор парка: отдельное Dash-приложение на том же сервере. Сводка и порядок строк
+# считаются на сервере (fleet.FleetAggregator), в браузер уходят только сводка
+# и видимая страница таблицы
+FLEET_SUMMARY_OUTPUTS = (
+    'fleet-robots',
+    'fleet-critical',
+    'fleet-warning',
+    'fleet-offline',
+    'fleet-normal',
+    'fleet-min-battery',
+    'fleet-max-temp'
+)
 
-    battery_level_style = {
-        **BATTERY_INDICATOR_STYLE['level'],
-        'width': f"{max(0, min(100, battery_data['charge_percent']))}%",
-    }
+FLEET_COLUMNS = (
+    ('robot', "Робот"),
+    ('status', "Состояние"),
+    ('motor_temp', "Температура, °C"),
+    ('vibration', "Вибрация, g"),
+    ('voltage', "Напряжение, V"),
+    ('current', "Ток, A"),
+    ('slip', "Пробуксовка"),
+    ('charge_percent', "Заряд, %"),
+    ('age', "Нет данных, с")
+)
+
+
+def fleet_summary_card(title, element_id, color='white'):
+    return dbc.Col(
+        dbc.Card(
+            dbc.CardBody([
+                html.Div(title, className="text-muted"),
+                html.Div("—", id=element_id, style={'fontSize': '1.5rem', 'color': color})
+            ]),
+            style=CARD_STYLE
+        )
+    )
+
+
+fleet_layout = dbc.Container(
+    fluid=True,
+    style={'backgroundColor': '#121212', 'padding': '20px', 'minHeight': '100vh'},
+    children=[
+        dbc.Row(
+            dbc.Col(
+                html.H2("ПАРК РОБОТОВ", style={'color': '#00ff99', 'textAlign': 'center'}),
+                width=12
+            ),
+            className="mb-3"
+        ),
+
+        dbc.Row([
+            fleet_summary_card("Роботов", 'fleet-robots'),
+            fleet_summary_card("Критических", 'fleet-critical', FLEET_STATUS_COLORS['critical']),
+            fleet_summary_card("Предупреждений", 'fleet-warning', FLEET_STATUS_COLORS['warning']),
+            fleet_summary_card("Нет связи", 'fleet-offline', FLEET_STATUS_COLORS['offline']),
+            fleet_summary_card("В норме", 'fleet-normal', FLEET_STATUS_COLORS['normal']),
+            fleet_summary_card("Мин. заряд", 'fleet-min-battery'),
+            fleet_summary_card("Макс. температура", 'fleet-max-temp')
+        ], className="mb-3 g-2"),
+
+        dbc.Checklist(
+            id='fleet-filter',
+            options=[{'label': name, 'value': name} for name in STATUS_NAMES],
+            value=list(STATUS_NAMES),
+            inline=True,
+            className="mb-2 text-white"
+        ),
+
+        # Страницы таблицы запрашиваются у сервера (page_action='custom')
+        dash_table.DataTable(
+            id='fleet-table',
+            columns=[{'name': title, 'id': column} for column, title in FLEET_COLUMNS],
+            page_action='custom',
+            page_current=0,
+            page_size=FLEET_PAGE_SIZE,
+            page_count=1,
+            style_table={'overflowX': 'auto'},
+            style_header={'backgroundColor': '#2a2a2a', 'color': 'white', 'fontWeight': 'bold'},
+            style_cell={'backgroundColor': '#1e1e1e', 'color': 'white', 'border': '1px solid #333',
+                        'padding': '2px 8px', 'fontSize': '0.85rem'},
+            style_data_conditional=[
+                {'if': {'filter_query': f'{{status}} = "{name}"', 'column_id': 'status'},
+                 'color': color, 'fontWeight': 'bold'}
+                for name, color in FLEET_STATUS_COLORS.items()
+            ]
+        ),
+
+        dcc.Interval(id='fleet-update', interval=1000)
+    ]
+)
 
-    return (
-        f"{motor_data['temp']:.1f}°C", motor_temp_style,
-        f"{motor_data['vibration']:.2f}g", vibration_style,
-        f"{motor_data['left_slip']:.2f}", left_slip_style,
-        f"{motor_data['right_slip']:.2f}", right_slip_style,
-        f"{battery_data['voltage']:.1f}V", voltage_style,
-        f"{current:.1f}A", current_style,
-        f"{distance:.1f} м",
-        f"{speed:.1f} м/с",
-        f"{roll:.1f}°",
-        f"{pitch:.1f}°",
-        f"{yaw:.1f}°",
-        battery_level_style,
-        f"{battery_data['charge_percent']:.1f}%",
-        alert_components,
-        play_alert
+fleet_app = None
+if FLEET_SOURCE:
+    fleet_app = dash.Dash(__name__, server=app.server, url_base_pathname='/fleet/',
+                          external_stylesheets=[dbc.themes.DARKLY],
+                          # Поток /telemetry/stream нужен только странице одного робота
+                          assets_ignore='telemetry_stream.js')
+    fleet_app.layout = fleet_layout
+
+    @fleet_app.callback(
+        [Output('fleet-table', 'data'),
+         Output('fleet-table', 'page_count')]
+        + [Output(element_id, 'children') for element_id in FLEET_SUMMARY_OUTPUTS],
+        Input('fleet-update', 'n_intervals'),
+        Input('fleet-table', 'page_current'),
+        Input('fleet-table', 'page_size'),
+        Input('fleet-filter', 'value')
     )
+    @FLEET_UPDATE_SECONDS.timed
+    def update_fleet(n, page_current, page_size, statuses):
+        page_current = page_current or 0
+        page_size = page_size or FLEET_PAGE_SIZE
+        summary, rows, total = fleet_aggregator.page(page_current * page_size, page_size, statuses)
+        counts = summary['counts']
+        min_battery, max_temp = summary['min_battery'], summary['max_temp']
+        return [
+            rows,
+            max(1, math.ceil(total / page_size)),
+            str(summary['robots']),
+            str(counts['critical']),
+            str(counts['warning']),
+            str(counts['offline']),
+            str(counts['normal']),
+            f"{min_battery['value']:.1f}% (№{min_battery['robot']})" if min_battery else "—",
+            f"{max_temp['value']:.1f}°C (№{max_temp['robot']})" if max_temp else "—"
+        ]
+
+
+# Воркеры gunicorn — отдельные процессы: /metrics отдает метрики всех воркеров с меткой pid
+metrics_collector = metrics.MultiprocessCollector('dashboard')
+metrics_collector.start()
+
+
+@app.server.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics_collector.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+# Рассылка кадров телеметрии подписчикам /telemetry/stream
+publisher = TelemetryPublisher(build_frame, rate_hz=PUSH_RATE_HZ)
+if TELEMETRY_PUSH:
+    publisher.start()
 
 
 if __name__ == '__main__':
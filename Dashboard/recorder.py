@@ -0,0 +1,395 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: часы воспроизведения меняет один процесс
+    fcntl = None
+
+from shared_state import SHARED_DIR
+from telemetry import CHANNELS, HISTORY_SECONDS
+
+# Записи для разбора инцидентов: телеметрию пишет процесс дашборда, кадры — сервер видеопотока
+RECORDING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+TELEMETRY_LOG = 'telemetry.rec'
+VIDEO_LOG = 'video.rec'
+
+# Заголовок файла журнала: сигнатура, версия, число каналов телеметрии
+LOG_MAGIC = b'RREC'
+LOG_VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH')
+# Заголовок записи: Unix-время, поток (-1 — телеметрия, иначе индекс камеры), длина данных
+RECORD_HEADER = struct.Struct('<dhxxI')
+TELEMETRY_STREAM = -1
+
+# Индекс журнала (файл .idx рядом с ним): время и положение данных каждой записи
+INDEX_DTYPE = np.dtype([('time', '<f8'), ('offset', '<i8'), ('length', '<u4'), ('stream', '<i2'), ('pad', '<i2')])
+# Как часто буферы журнала и индекса сбрасываются на диск, секунды
+FLUSH_INTERVAL = 1.0
+
+MIN_REPLAY_SPEED = 1.0
+MAX_REPLAY_SPEED = 50.0
+# Через сколько секунд без новых кадров (пауза, конец записи) повторяется текущий кадр
+REPEAT_INTERVAL = 1.0
+
+
+def scan_records(path, offset, size):
+    """Восстанавливает записи индекса, читая заголовки журнала с offset; обрывается на неполной записи"""
+    entries = []
+    with open(path, 'rb') as f:
+        while offset + RECORD_HEADER.size <= size:
+            f.seek(offset)
+            timestamp, stream, length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            data_offset = offset + RECORD_HEADER.size
+            if data_offset + length > size:
+                break
+            entries.append((timestamp, data_offset, length, stream, 0))
+            offset = data_offset + length
+    return np.array(entries, dtype=INDEX_DTYPE)
+
+
+def load_index(path):
+    """Индекс журнала; записи, не попавшие в .idx (например, после сбоя), дочитываются из журнала"""
+    size = os.path.getsize(path)
+    try:
+        with open(path + '.idx', 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = b''
+    entries = np.frombuffer(data[:len(data) // INDEX_DTYPE.itemsize * INDEX_DTYPE.itemsize], dtype=INDEX_DTYPE)
+    # Индекс пишется после журнала, но буферы сбрасываются независимо
+    entries = entries[entries['offset'] + entries['length'] <= size]
+    end = int(entries['offset'][-1] + entries['length'][-1]) if len(entries) else FILE_HEADER.size
+    return np.concatenate([entries, scan_records(path, end, size)])
+
+
+# Журнал записи: телеметрия и готовые JPEG-кадры в одном файле только на дозапись.
+# Кадры пишутся в основном варианте потока (полный размер, camera_component.DEFAULT_JPEG_QUALITY) независимо от варианта клиента
+class RecordingWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        if os.path.exists(path) and os.path.getsize(path) >= FILE_HEADER.size:
+            entries = load_index(path)
+            end = int(entries['offset'][-1] + entries['length'][-1]) if len(entries) else FILE_HEADER.size
+            # Неполная последняя запись (сбой во время записи) отбрасывается, индекс пишется заново
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+            with open(path + '.idx', 'wb') as f:
+                f.write(entries.tobytes())
+            self._last_time = float(entries['time'][-1]) if len(entries) else 0.0
+        else:
+            with open(path, 'wb') as f:
+                f.write(FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION, len(CHANNELS)))
+            open(path + '.idx', 'wb').close()
+            self._last_time = 0.0
+        self._log = open(path, 'ab')
+        self._index = open(path + '.idx', 'ab')
+        self._offset = self._log.tell()
+        self._flushed = time.monotonic()
+        # Последний записанный кадр каждой камеры: кадр, отправленный нескольким клиентам, пишется один раз
+        self._last_frame = {}
+
+    def _write(self, stream, payload, timestamp=None):
+        with self._lock:
+            # Метки времени в журнале не убывают, даже если системные часы подвели назад
+            timestamp = max(time.time() if timestamp is None else timestamp, self._last_time)
+            self._last_time = timestamp
+            self._log.write(RECORD_HEADER.pack(timestamp, stream, len(payload)))
+            self._log.write(payload)
+            entry = np.array([(timestamp, self._offset + RECORD_HEADER.size, len(payload), stream, 0)],
+                             dtype=INDEX_DTYPE)
+            self._index.write(entry.tobytes())
+            self._offset += RECORD_HEADER.size + len(payload)
+            if time.monotonic() - self._flushed > FLUSH_INTERVAL:
+                self._flush()
+
+    def write_telemetry(self, rows, timestamp=None):
+        """Пишет блок отсчетов формы (n, len(CHANNELS))"""
+        rows = np.ascontiguousarray(rows, dtype='<f8').reshape(-1, len(CHANNELS))
+        if len(rows):
+            self._write(TELEMETRY_STREAM, rows.tobytes(), timestamp)
+
+    def wants_frame(self, camera, seq):
+        """Нужен ли записи кадр seq камеры camera (каждый кадр пишется один раз)"""
+        with self._lock:
+            return self._last_frame.get(camera, 0) < seq
+
+    def write_frame(self, camera, seq, jpeg, timestamp=None):
+        """Пишет JPEG кадра seq камеры camera, если этот кадр еще не записан"""
+        with self._lock:
+            if self._last_frame.get(camera, 0) >= seq:
+                return
+            self._last_frame[camera] = seq
+        self._write(camera, jpeg, timestamp)
+
+    def _flush(self):
+        self._log.flush()
+        self._index.flush()
+        self._flushed = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+            self._index.close()
+
+
+# Чтение журнала: по потоку — отсортированные метки времени, поиск момента — бинарный, O(log n)
+class RecordingReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, self.width = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path}: не журнал записи версии {LOG_VERSION}")
+        entries = load_index(path)
+        self._streams = {}
+        for stream in np.unique(entries['stream']).tolist():
+            selected = entries[entries['stream'] == stream]
+            self._streams[stream] = (np.ascontiguousarray(selected['time']),
+                                     selected['offset'].copy(), selected['length'].copy())
+        self.start_time = float(entries['time'][0]) if len(entries) else 0.0
+        self.end_time = float(entries['time'][-1]) if len(entries) else 0.0
+        self._fd = os.open(path, os.O_RDONLY)
+
+    @property
+    def cameras(self):
+        return sorted(stream for stream in self._streams if stream != TELEMETRY_STREAM)
+
+    def count(self, stream):
+        return len(self._streams[stream][0]) if stream in self._streams else 0
+
+    def times(self, stream):
+        return self._streams[stream][0]
+
+    def find(self, stream, timestamp):
+        """Номер последней записи потока не позже timestamp; -1, если таких нет"""
+        if stream not in self._streams:
+            return -1
+        return int(np.searchsorted(self._streams[stream][0], timestamp, side='right')) - 1
+
+    def read(self, stream, i):
+        _, offsets, lengths = self._streams[stream]
+        return os.pread(self._fd, int(lengths[i]), int(offsets[i]))
+
+    def read_telemetry(self, i0, i1):
+        """Отсчеты телеметрии записей [i0, i1) одним массивом"""
+        if i1 <= i0:
+            return np.empty((0, self.width))
+        _, offsets, lengths = self._streams[TELEMETRY_STREAM]
+        # Записи потока лежат в журнале не подряд (между ними кадры), читаются по одной
+        blocks = [os.pread(self._fd, int(lengths[i]), int(offsets[i])) for i in range(i0, i1)]
+        return np.frombuffer(b''.join(blocks), dtype='<f8').reshape(-1, self.width)
+
+    def close(self):
+        os.close(self._fd)
+
+
+# Часы воспроизведения в общей памяти: дашборд и сервер видеопотока (разные процессы)
+# показывают один и тот же момент записи, переход и смена скорости видны обоим
+CLOCK_INT_WORDS = 2
+SEQ, SEEKS = range(CLOCK_INT_WORDS)
+ORIGIN, WALL, SPEED = range(3)
+
+
+class ReplayClock:
+    def __init__(self, name='robot_replay_clock', directory=SHARED_DIR):
+        self.path = os.path.join(directory, f"{name}.buf")
+        size = CLOCK_INT_WORDS * 8 + 3 * 8
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        # Счетчики seqlock и переходов; время записи, соответствующее Unix-времени WALL, и скорость
+        self._counters = np.frombuffer(self._mmap, dtype=np.int64, count=CLOCK_INT_WORDS)
+        self._values = np.frombuffer(self._mmap, dtype=np.float64, offset=CLOCK_INT_WORDS * 8, count=3)
+        self._lock = threading.Lock()
+
+    def _read(self):
+        while True:
+            seq = int(self._counters[SEQ])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            seeks = int(self._counters[SEEKS])
+            origin, wall, speed = self._values.tolist()
+            if int(self._counters[SEQ]) == seq:
+                return seeks, origin, wall, speed
+
+    def _update(self, change):
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                seeks, origin, wall, speed = self._read()
+                values = change(seeks, origin, wall, speed)
+                if values is None:
+                    return
+                self._counters[SEQ] += 1
+                self._counters[SEEKS], self._values[:] = values[0], values[1:]
+                self._counters[SEQ] += 1
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def ensure_started(self, start, end=None, speed=MIN_REPLAY_SPEED):
+        """Запускает часы с момента start, если их еще не запустил другой процесс.
+
+        Часы, ушедшие за пределы записи [start, end] (прошлый сеанс), запускаются заново
+        """
+        def change(seeks, origin, wall, old_speed):
+            now = origin + (time.time() - wall) * old_speed
+            if seeks and (end is None or start <= now <= end):
+                return None
+            return seeks + 1, start, time.time(), speed
+        self._update(change)
+
+    def now(self):
+        """Возвращает (текущий момент записи, номер перехода)"""
+        seeks, origin, wall, speed = self._read()
+        return origin + (time.time() - wall) * speed, seeks
+
+    @property
+    def speed(self):
+        return self._read()[3]
+
+    def seek(self, timestamp):
+        self._update(lambda seeks, origin, wall, speed: (seeks + 1, timestamp, time.time(), speed))
+
+    def set_speed(self, speed):
+        speed = max(MIN_REPLAY_SPEED, min(MAX_REPLAY_SPEED, speed))
+
+        def change(seeks, origin, wall, old_speed):
+            now = time.time()
+            return seeks, origin + (now - wall) * old_speed, now, speed
+        self._update(change)
+
+
+# Пишет новые отсчеты кольцевого буфера телеметрии в журнал
+class TelemetryRecorder:
+    def __init__(self, buffer, writer, interval=0.1):
+        self.buffer = buffer
+        self.writer = writer
+        self.interval = interval
+        self._count = buffer.count
+        self._running = False
+        self._thread = None
+
+    def write_pending(self):
+        rows, self._count = self.buffer.since(self._count)
+        self.writer.write_telemetry(rows)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._count = self.buffer.count
+        self._thread = threading.Thread(target=self._run, daemon=True, name="telemetry-recorder")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self.write_pending()
+        self.writer.flush()
+
+    def _run(self):
+        while self._running:
+            time.sleep(self.interval)
+            self.write_pending()
+
+
+# Воспроизведение телеметрии: отсчеты записи попадают в буфер по часам воспроизведения
+class TelemetryReplay:
+    def __init__(self, reader, buffer, clock, history=HISTORY_SECONDS, interval=0.02):
+        self.reader = reader
+        self.buffer = buffer
+        self.clock = clock
+        self.history = history
+        self.interval = interval
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self.clock.ensure_started(self.reader.start_time, self.reader.end_time)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="telemetry-replay")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        seeks = None
+        cursor = 0
+        while self._running:
+            now, current_seeks = self.clock.now()
+            if current_seeks != seeks:
+                seeks = current_seeks
+                # После перехода в буфер сразу попадает окно истории перед этим моментом, чтобы графики не были пустыми
+                cursor = self.reader.find(TELEMETRY_STREAM, now - self.history) + 1
+            end = self.reader.find(TELEMETRY_STREAM, now) + 1
+            if end > cursor:
+                self.buffer.extend(self.reader.read_telemetry(cursor, end))
+                cursor = end
+            time.sleep(self.interval)
+
+
+# Источник кадров с интерфейсом cv2.VideoCapture, отдающий записанные JPEG по часам воспроизведения.
+# read() возвращает байты JPEG, а не декодированный кадр (см. camera_component.ReplayBroadcaster)
+class ReplayCapture:
+    def __init__(self, reader, clock, index):
+        self.reader = reader
+        self.clock = clock
+        self.index = index
+        self._seeks = None
+        self._next = 0
+        self._frame = None
+
+    def isOpened(self):
+        return self.reader.count(self.index) > 0
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+        times = self.reader.times(self.index)
+        deadline = time.monotonic() + REPEAT_INTERVAL
+        while True:
+            now, seeks = self.clock.now()
+            if seeks != self._seeks:
+                # После перехода сразу показывается кадр, действовавший в этот момент
+                self._seeks = seeks
+                self._next = max(self.reader.find(self.index, now), 0)
+                self._frame = None
+            current = self.reader.find(self.index, now)
+            if self._frame is None or current >= self._next:
+                # Опоздавшие кадры (высокая скорость, медленный клиент) пропускаются
+                i = self._next if self._frame is None else current
+                self._next = i + 1
+                self._frame = self.reader.read(self.index, i)
+                return True, self._frame
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True, self._frame
+            wait = remaining
+            if self._next < len(times):
+                wait = min(wait, (times[self._next] - now) / self.clock.speed)
+            time.sleep(max(wait, 0.001))
+
+    def release(self):
+        pass
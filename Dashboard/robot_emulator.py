@@ -0,0 +1,63 @@
+"""Эмулятор робота: шлет телеметрию MotorSimulator/BatterySimulator по UDP.
+
+Пример: python robot_emulator.py --rate 1000 --batch 20 --port 9870
+"""
+import argparse
+import socket
+import time
+
+from telemetry import TelemetryAcquisition, CHANNELS
+from udp_ingest import UDP_PORT, DEFAULT_BATCH, pack_packet, rows_to_records
+
+TIME_COLUMN = CHANNELS.index('time')
+
+
+def run_emulator(host='127.0.0.1', port=UDP_PORT, rate_hz=1000.0, batch=DEFAULT_BATCH,
+                 robot_id=0, duration=None):
+    """Шлет пакеты по batch отсчетов с частотой rate_hz; возвращает число отправленных отсчетов"""
+    acquisition = TelemetryAcquisition(buffer=None, rate_hz=rate_hz)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    period = 1.0 / rate_hz
+    start_wall = time.time()
+    start = time.perf_counter()
+    next_send = start
+    seq = 0
+    sent = 0
+    try:
+        while duration is None or time.perf_counter() - start < duration:
+            records = rows_to_records(acquisition.block(batch, period))
+            # Время симуляции переводится в Unix-время робота
+            records['time'] += start_wall
+            sock.sendto(pack_packet(records, robot_id, seq), (host, port))
+            seq += 1
+            sent += batch
+            next_send += batch * period
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        sock.close()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Эмулятор телеметрии робота по UDP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=UDP_PORT)
+    parser.add_argument('--rate', type=float, default=1000.0, help="частота отсчетов, Гц")
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH, help="отсчетов в пакете")
+    parser.add_argument('--robot-id', type=int, default=0)
+    parser.add_argument('--duration', type=float, default=None, help="время работы, с")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        sent = run_emulator(args.host, args.port, args.rate, args.batch, args.robot_id, args.duration)
+    except KeyboardInterrupt:
+        return
+    elapsed = time.perf_counter() - started
+    print(f"Отправлено отсчетов: {sent} за {elapsed:.1f} с ({sent / elapsed:.0f} Гц)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: несколько воркеров там не запускаются, процесс всегда пишущий
+    fcntl = None
+
+from telemetry import CHANNELS
+
+# Файл в /dev/shm живет в оперативной памяти и виден всем процессам (воркерам gunicorn)
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+# Как часто читающий процесс пробует стать пишущим, если тот завершился
+ELECTION_INTERVAL = 2.0
+
+# Заголовок: счетчик seqlock, число записанных отсчетов, емкость, число каналов
+HEADER_WORDS = 4
+SEQ, COUNT, CAPACITY, WIDTH = range(HEADER_WORDS)
+
+
+# Кольцевой буфер телеметрии в общей памяти с тем же интерфейсом, что TelemetryBuffer.
+# Пишет один процесс (seqlock), читают все без блокировок и без копирования через IPC
+class SharedTelemetryBuffer:
+    def __init__(self, capacity, name='robot_telemetry', directory=SHARED_DIR):
+        self.capacity = capacity
+        width = len(CHANNELS)
+        # Размеры входят в имя файла, чтобы не подключиться к буферу другой конфигурации
+        self.path = os.path.join(directory, f"{name}_{capacity}x{width}.buf")
+        size = (HEADER_WORDS + capacity * width) * 8
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        self._header = np.frombuffer(self._mmap, dtype=np.int64, count=HEADER_WORDS)
+        self._data = np.frombuffer(self._mmap, dtype=np.float64, offset=HEADER_WORDS * 8,
+                                   count=capacity * width).reshape(capacity, width)
+        self._header[CAPACITY] = capacity
+        self._header[WIDTH] = width
+        self._write_lock = threading.Lock()
+        self.is_writer = False
+
+    def try_become_writer(self):
+        """Берет эксклюзивную блокировку файла; владелец блокировки — единственный писатель"""
+        if self.is_writer:
+            return True
+        if fcntl is None:
+            self.is_writer = True
+            return True
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.is_writer = True
+        # Писатель мог упасть посреди записи и оставить нечетный счетчик
+        if self._header[SEQ] & 1:
+            self._header[SEQ] += 1
+        return True
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def count(self):
+        return int(self._header[COUNT])
+
+    def _read(self, reader):
+        """Согласованное чтение: повторяется, если писатель менял буфер во время чтения"""
+        while True:
+            seq = int(self._header[SEQ])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            result = reader(int(self._header[COUNT]))
+            if int(self._header[SEQ]) == seq:
+                return result
+
+    def extend(self, rows):
+        """Дописывает блок отсчетов; вызывается только процессом-писателем"""
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape(-1, len(CHANNELS))
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+        with self._write_lock:
+            count = int(self._header[COUNT])
+            self._header[SEQ] += 1
+            start = count % self.capacity
+            end = start + len(rows)
+            if end <= self.capacity:
+                self._data[start:end] = rows
+            else:
+                split = self.capacity - start
+                self._data[start:] = rows[:split]
+                self._data[:end - self.capacity] = rows[split:]
+            self._header[COUNT] = count + len(rows)
+            self._header[SEQ] += 1
+
+    def append(self, row):
+        self.extend(row)
+
+    def _rows(self, count, n):
+        end = count % self.capacity
+        return self._data[np.arange(end - n, end) % self.capacity]
+
+    def latest(self):
+        """Возвращает последний отсчет как словарь канал -> значение или None, если данных нет"""
+        row = self._read(lambda count: self._rows(count, 1) if count else None)
+        if row is None:
+            return None
+        return dict(zip(CHANNELS, row[0].tolist()))
+
+    def since(self, count):
+        """Возвращает (отсчеты, записанные после count, текущий count); старше емкости буфера — теряются"""
+        def reader(current):
+            n = min(current - count, self.capacity, current)
+            return self._rows(current, max(n, 0)), current
+        return self._read(reader)
+
+    def snapshot(self, n=None):
+        """Возвращает копию последних n отсчетов в хронологическом порядке"""
+        def reader(current):
+            size = min(current, self.capacity)
+            return self._rows(current, size if n is None else min(n, size))
+        return self._read(reader)
+
+
+# Выбор писателя среди процессов: кто взял блокировку, запускает сбор данных.
+# Остальные периодически пробуют ее взять на случай, если писатель завершится
+class WriterElection:
+    def __init__(self, buffer, on_elected, interval=ELECTION_INTERVAL):
+        self.buffer = buffer
+        self.on_elected = on_elected
+        self.interval = interval
+        self._thread = None
+
+    def start(self):
+        if self.buffer.try_become_writer():
+            self.on_elected()
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name="writer-election")
+        self._thread.start()
+
+    def _run(self):
+        while not self.buffer.try_become_writer():
+            time.sleep(self.interval)
+        self.on_elected()
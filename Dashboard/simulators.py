@@ -0,0 +1,157 @@
+import math
+import random
+
+import numpy as np
+
+
+# Класс для имитации работы двигателя
+class MotorSimulator:
+    def __init__(self):
+        self.time = 0
+        self.temp = 25.0
+        self.load = 0.3
+        self.left_slip = 0.0
+        self.right_slip = 0.0
+
+    def update(self, dt):
+        self.time += dt
+        self.load = 0.3 + 0.5 * (0.5 + 0.5 * math.sin(self.time * 0.2))
+        temp_change = (self.load * 0.1 - 0.02) * dt
+        self.temp += temp_change
+        self.temp = max(25.0, min(self.temp, 95.0))
+        vibration = 0.05 + 0.15 * self.load + 0.03 * random.random()
+
+        # Имитация пробуксовки (значения теперь не превышают пределы слишком часто).
+        # Блуждание масштабируется по dt, чтобы дрейф не зависел от частоты опроса;
+        # при dt = 1 это прежнее random.uniform(-0.02, 0.03)
+        slip_change = 0.005 * dt + random.uniform(-0.025, 0.025) * math.sqrt(dt)
+        self.left_slip = max(0, min(0.35, self.left_slip + slip_change))
+        self.right_slip = max(0, min(0.35, self.right_slip + slip_change))
+
+        return {
+            'temp': self.temp,
+            'vibration': vibration,
+            'load': self.load,
+            'left_slip': self.left_slip,
+            'right_slip': self.right_slip
+        }
+
+
+# Класс для имитации батареи
+class BatterySimulator:
+    def __init__(self):
+        self.voltage = 24.8
+        self.capacity = 3000
+        self.max_capacity = 5000
+
+    def update(self, current, dt):
+        self.capacity -= current * 1000 * dt / 3600
+        self.capacity = max(0, self.capacity)
+        charge_percent = self.capacity / self.max_capacity * 100
+        base_voltage = 24.0 * (charge_percent / 100.0)
+        # Уменьшил падение напряжения, чтобы оно реже опускалось ниже предупреждений
+        voltage_drop = 10
+        self.voltage = base_voltage - voltage_drop
+
+        return {
+            'voltage': self.voltage,
+            'capacity': self.capacity,
+            'charge_percent': charge_percent
+        }
+
+
+# Парк роботов: состояние N роботов хранится в массивах NumPy и обновляется одним шагом.
+# Модель двигателя та же, что у MotorSimulator; напряжение батареи линейно по заряду
+# от empty_voltage (разряжена) до full_voltage, начальный заряд — случайный в initial_charge
+class FleetSimulator:
+    def __init__(self, n_robots, seed=None, full_voltage=25.2, empty_voltage=19.5, initial_charge=(0.05, 1.0)):
+        self.n_robots = n_robots
+        self.rng = np.random.default_rng(seed)
+        self.time = 0.0
+        # Сдвиг фазы нагрузки, чтобы роботы не работали синхронно
+        self.phase = self.rng.uniform(0, 2 * math.pi, n_robots)
+        self.temp = np.full(n_robots, 25.0)
+        self.load = np.full(n_robots, 0.3)
+        self.left_slip = np.zeros(n_robots)
+        self.right_slip = np.zeros(n_robots)
+        self.max_capacity = 5000
+        self.capacity = self.rng.uniform(*initial_charge, n_robots) * self.max_capacity
+        self.full_voltage = full_voltage
+        self.empty_voltage = empty_voltage
+        self.voltage = np.zeros(n_robots)
+
+    def update(self, dt):
+        self.time += dt
+        n = self.n_robots
+        self.load = 0.3 + 0.5 * (0.5 + 0.5 * np.sin(self.time * 0.2 + self.phase))
+        self.temp += (self.load * 0.1 - 0.02) * dt
+        np.clip(self.temp, 25.0, 95.0, out=self.temp)
+        vibration = 0.05 + 0.15 * self.load + 0.03 * self.rng.random(n)
+
+        slip_change = 0.005 * dt + self.rng.uniform(-0.025, 0.025, n) * math.sqrt(dt)
+        np.clip(self.left_slip + slip_change, 0, 0.35, out=self.left_slip)
+        np.clip(self.right_slip + slip_change, 0, 0.35, out=self.right_slip)
+
+        current = 2.0 + 3.0 * self.load
+        self.capacity -= current * 1000 * dt / 3600
+        np.maximum(self.capacity, 0, out=self.capacity)
+        charge_percent = self.capacity / self.max_capacity * 100
+        self.voltage = self.empty_voltage + (self.full_voltage - self.empty_voltage) * charge_percent / 100.0
+
+        return {
+            'temp': self.temp,
+            'vibration': vibration,
+            'load': self.load,
+            'left_slip': self.left_slip,
+            'right_slip': self.right_slip,
+            'voltage': self.voltage,
+            'current': current,
+            'capacity': self.capacity,
+            'charge_percent': charge_percent
+        }
+
+
+# Имитация IMU: гироскоп (рад/с) и акселерометр (м/с²) для плавных кренов и поворота робота.
+# Отсчеты блока считаются одним проходом NumPy по массиву моментов времени
+class ImuSimulator:
+    def __init__(self, gyro_noise=0.01, gyro_bias=0.002, accel_noise=0.3, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.gyro_noise = gyro_noise
+        self.gyro_bias = self.rng.uniform(-gyro_bias, gyro_bias, 3)
+        self.accel_noise = accel_noise
+
+    def attitude(self, times):
+        """Истинная ориентация (крен, тангаж, рыскание) в радианах и ее производные"""
+        t = np.asarray(times, dtype=float)
+        roll = np.radians(2.5) * np.sin(t * 0.1)
+        pitch = np.radians(-1.2) * np.sin(t * 0.15)
+        # Поворот на 1°/с с небольшим покачиванием курса
+        yaw = np.radians(1.0) * t + np.radians(3.0) * np.sin(t * 0.05)
+        rates = np.stack([
+            np.radians(2.5) * 0.1 * np.cos(t * 0.1),
+            np.radians(-1.2) * 0.15 * np.cos(t * 0.15),
+            np.radians(1.0) + np.radians(3.0) * 0.05 * np.cos(t * 0.05)
+        ], axis=-1)
+        return np.stack([roll, pitch, yaw], axis=-1), rates
+
+    def block(self, times):
+        """Показания (gyro, accel) формы (n, 3) в моменты times"""
+        angles, rates = self.attitude(times)
+        roll, pitch = angles[:, 0], angles[:, 1]
+        droll, dpitch, dyaw = rates[:, 0], rates[:, 1], rates[:, 2]
+        # Скорости углов Эйлера -> угловая скорость в осях корпуса
+        gyro = np.stack([
+            droll - dyaw * np.sin(pitch),
+            dpitch * np.cos(roll) + dyaw * np.sin(roll) * np.cos(pitch),
+            -dpitch * np.sin(roll) + dyaw * np.cos(roll) * np.cos(pitch)
+        ], axis=-1)
+        gyro += self.gyro_bias + self.rng.normal(0, self.gyro_noise, gyro.shape)
+        # Робот движется без заметных ускорений: акселерометр видит только силу тяжести
+        g = 9.81
+        accel = np.stack([
+            -g * np.sin(pitch),
+            g * np.sin(roll) * np.cos(pitch),
+            g * np.cos(roll) * np.cos(pitch)
+        ], axis=-1)
+        accel += self.rng.normal(0, self.accel_noise, accel.shape)
+        return gyro, accel
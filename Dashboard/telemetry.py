@@ -0,0 +1,206 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+from imu import IMU_RATE_HZ, AttitudeEstimator
+from simulators import MotorSimulator, BatterySimulator, ImuSimulator
+
+# Частота опроса датчиков и глубина истории в кольцевом буфере
+SAMPLE_RATE_HZ = 100.0
+HISTORY_SECONDS = 60
+
+# Каналы телеметрии: столбцы кольцевого буфера
+CHANNELS = (
+    'time',
+    'motor_temp',
+    'vibration',
+    'load',
+    'left_slip',
+    'right_slip',
+    'voltage',
+    'current',
+    'capacity',
+    'charge_percent',
+    'distance',
+    'speed',
+    'roll',
+    'pitch',
+    'yaw'
+)
+CHANNEL_INDEX = {name: i for i, name in enumerate(CHANNELS)}
+ATTITUDE_COLUMNS = slice(CHANNEL_INDEX['roll'], CHANNEL_INDEX['yaw'] + 1)
+
+
+# Кольцевой буфер телеметрии: память выделяется один раз, запись и чтение последнего отсчета — O(1)
+class TelemetryBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros((capacity, len(CHANNELS)))
+        # Общее число записанных отсчетов; позиция в буфере — остаток от деления
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def count(self):
+        return self._count
+
+    def extend(self, rows):
+        """Дописывает блок отсчетов формы (n, len(CHANNELS))"""
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape(-1, len(CHANNELS))
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+        with self._lock:
+            start = self._count % self.capacity
+            end = start + len(rows)
+            if end <= self.capacity:
+                self._data[start:end] = rows
+            else:
+                split = self.capacity - start
+                self._data[start:] = rows[:split]
+                self._data[:end - self.capacity] = rows[split:]
+            self._count += len(rows)
+
+    def append(self, row):
+        self.extend(row)
+
+    def latest(self):
+        """Возвращает последний отсчет как словарь канал -> значение или None, если данных нет"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            row = self._data[(self._count - 1) % self.capacity].copy()
+        return dict(zip(CHANNELS, row.tolist()))
+
+    def since(self, count):
+        """Возвращает (отсчеты, записанные после count, текущий count); старше емкости буфера — теряются"""
+        with self._lock:
+            n = min(self._count - count, self.capacity, self._count)
+            end = self._count % self.capacity
+            idx = np.arange(end - n, end) % self.capacity
+            return self._data[idx], self._count
+
+    def snapshot(self, n=None):
+        """Возвращает копию последних n отсчетов в хронологическом порядке"""
+        with self._lock:
+            size = min(self._count, self.capacity)
+            n = size if n is None else min(n, size)
+            end = self._count % self.capacity
+            idx = np.arange(end - n, end) % self.capacity
+            return self._data[idx]
+
+
+# Цикл сбора данных: опрашивает симуляторы с фиксированной частотой независимо от Dash
+class TelemetryAcquisition:
+    def __init__(self, buffer, rate_hz=SAMPLE_RATE_HZ, motor=None, battery=None, imu=None,
+                 imu_rate_hz=IMU_RATE_HZ):
+        self.buffer = buffer
+        self.rate_hz = rate_hz
+        self.motor = motor or MotorSimulator()
+        self.battery = battery or BatterySimulator()
+        # IMU опрашивается чаще телеметрии; ориентация считается фильтром по блокам его отсчетов
+        self.imu = imu or ImuSimulator()
+        self.imu_rate_hz = imu_rate_hz
+        self.attitude = AttitudeEstimator()
+        self.imu_time = 0.0
+        self.time = 0.0
+        self.distance = 0.0
+        self._running = False
+        self._thread = None
+
+    def resume(self, sample):
+        """Продолжает симуляцию с отсчета sample (например, после смены процесса-писателя)"""
+        self.time = sample['time']
+        self.distance = sample['distance']
+        self.motor.time = sample['time']
+        self.motor.temp = sample['motor_temp']
+        self.motor.left_slip = sample['left_slip']
+        self.motor.right_slip = sample['right_slip']
+        self.battery.capacity = sample['capacity']
+        self.imu_time = sample['time']
+        self.attitude.reset(np.radians([sample['roll'], sample['pitch'], sample['yaw']]), sample['time'])
+
+    def sample(self, dt):
+        """Продвигает симуляторы на dt секунд и возвращает строку буфера"""
+        return tuple(self.block(1, dt)[0].tolist())
+
+    def block(self, n, dt):
+        """Продвигает симуляторы на n шагов по dt секунд и возвращает строки буфера (n, len(CHANNELS))"""
+        rows = np.array([self._step(dt) for _ in range(n)])
+        # Отсчеты IMU за тот же интервал обрабатываются фильтром одним блоком
+        previous = np.degrees(self.attitude.angles)
+        count = int((self.time - self.imu_time) * self.imu_rate_hz + 1e-9)
+        if count:
+            imu_times = self.imu_time + np.arange(1, count + 1) / self.imu_rate_hz
+            gyro, accel = self.imu.block(imu_times)
+            angles = np.degrees(self.attitude.update(imu_times, gyro, accel))
+            self.imu_time = float(imu_times[-1])
+            # Каждой строке — ориентация по последнему отсчету IMU не позже нее
+            index = np.searchsorted(imu_times, rows[:, 0] + 1e-9, side='right') - 1
+            attitude = np.where((index >= 0)[:, None], angles[np.maximum(index, 0)], previous)
+        else:
+            attitude = np.repeat(previous[None], n, axis=0)
+        attitude[:, 2] %= 360
+        rows[:, ATTITUDE_COLUMNS] = attitude
+        return rows
+
+    def _step(self, dt):
+        self.time += dt
+        t = self.time
+        motor_data = self.motor.update(dt)
+        current = 2.0 + 3.0 * motor_data['load']
+        battery_data = self.battery.update(current, dt)
+        speed = 0.01 * (1200 + 50 * math.sin(t * 0.5))
+        self.distance += speed * dt
+
+        return (
+            t,
+            motor_data['temp'],
+            motor_data['vibration'],
+            motor_data['load'],
+            motor_data['left_slip'],
+            motor_data['right_slip'],
+            battery_data['voltage'],
+            current,
+            battery_data['capacity'],
+            battery_data['charge_percent'],
+            self.distance,
+            speed,
+            # Ориентацию заполняет block() по отсчетам IMU
+            0.0,
+            0.0,
+            0.0
+        )
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="telemetry-acquisition")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        next_tick = time.perf_counter()
+        while self._running:
+            now = time.perf_counter()
+            # Все отсчеты, чей срок наступил, пишутся одним блоком (спасает при неточном sleep)
+            due = int((now - next_tick) / period) + 1
+            if due > self.buffer.capacity:
+                # После долгой паузы пропущенный интервал не догоняем
+                next_tick = now
+                due = 1
+            self.buffer.extend(self.block(due, period))
+            next_tick += due * period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
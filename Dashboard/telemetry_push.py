@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+
+import metrics
+
+# Частота рассылки кадров и период пустых сообщений, по которым отваливаются закрытые соединения
+PUSH_RATE_HZ = 10
+KEEPALIVE_SECONDS = 15
+
+STREAM_CLIENTS = metrics.Gauge('telemetry_stream_clients', "Подписчики /telemetry/stream")
+
+
+# Рассылает кадры телеметрии по Server-Sent Events: кадр строится и сериализуется
+# один раз, подписчики только ждут следующего
+class TelemetryPublisher:
+    def __init__(self, build_frame, rate_hz=PUSH_RATE_HZ):
+        self.build_frame = build_frame
+        self.rate_hz = rate_hz
+        self._cond = threading.Condition()
+        self._message = None
+        self._payload = None
+        self._seq = 0
+        self._running = False
+        self._thread = None
+
+    def publish(self, frame):
+        """Публикует кадр; одинаковые подряд кадры не рассылаются"""
+        payload = json.dumps(frame, ensure_ascii=False)
+        with self._cond:
+            if payload == self._payload:
+                return
+            self._payload = payload
+            self._message = f"data: {payload}\n\n".encode()
+            self._seq += 1
+            self._cond.notify_all()
+
+    def stream(self):
+        """Генератор событий для одного подписчика; медленный клиент получает только последний кадр"""
+        last_seq = 0
+        STREAM_CLIENTS.inc()
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != last_seq, KEEPALIVE_SECONDS)
+                    seq, message = self._seq, self._message
+                if seq == last_seq:
+                    yield b": keepalive\n\n"
+                    continue
+                last_seq = seq
+                yield message
+        finally:
+            STREAM_CLIENTS.dec()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="telemetry-publisher")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        while self._running:
+            frame = self.build_frame()
+            if frame is not None:
+                self.publish(frame)
+            time.sleep(period)
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+
+from alerts import AlertEngine, RULE_CHANNELS, SEVERITY_WARNING
+from simulators import MotorSimulator
+from telemetry import SAMPLE_RATE_HZ
+
+VIBRATION = RULE_CHANNELS.index('vibration')
+
+
+def simulate_vibration(seconds, seed=0):
+    """Отсчеты правил с вибрацией MotorSimulator и остальными каналами в норме"""
+    random.seed(seed)
+    motor = MotorSimulator()
+    rows = np.tile([30.0, 0.0, 24.0, 3.0, 0.0, 0.0], (int(seconds * SAMPLE_RATE_HZ), 1))
+    for row in rows:
+        row[VIBRATION] = motor.update(1.0 / SAMPLE_RATE_HZ)['vibration']
+    return rows
+
+
+def test_vibration_warning_clears_on_simulator():
+    rows = simulate_vibration(120)
+    engine = AlertEngine()
+    severity = np.concatenate([engine.update(rows[i:i + 10]) for i in range(0, len(rows), 10)])[:, VIBRATION]
+    changes = np.flatnonzero(np.diff(severity))
+    # Нагрузка меняется с периодом ~31 с: предупреждение срабатывает и снимается в каждом цикле
+    assert (severity == SEVERITY_WARNING).any()
+    assert (severity == 0).mean() > 0.3
+    assert 4 <= len(changes) <= 2 * (120 // 31 + 1)
+    # Без дребезга: между переходами не меньше секунды
+    assert np.diff(changes).min() >= SAMPLE_RATE_HZ
+
+
+def test_batch_matches_per_sample():
+    rows = simulate_vibration(40, seed=1)
+    batch = AlertEngine().update(rows)
+    engine = AlertEngine()
+    single = np.concatenate([engine.update(row[None]) for row in rows])
+    np.testing.assert_array_equal(batch, single)
+
+
+def test_debounce_and_clear_in_seconds():
+    engine = AlertEngine(rate_hz=10, debounce=0.5, clear=1.0)
+    values = np.zeros((40, len(RULE_CHANNELS)))
+    values[:, 2] = 24.0
+    values[:20, VIBRATION] = 0.2
+    severity = engine.update(values)[:, VIBRATION]
+    # Срабатывает на 5-м отсчете за пределом, снимается на 10-м отсчете ниже порога снятия
+    assert severity[:4].max() == 0 and severity[4] == SEVERITY_WARNING
+    assert severity[28] == SEVERITY_WARNING and severity[29] == 0
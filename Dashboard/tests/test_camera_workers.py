@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+from camera_workers import FRAME_SLOT_BYTES, SharedFrameRing, remove_stale_rings
+
+
+def test_ring_round_trip(tmp_path):
+    path = str(tmp_path / 'camera.ring')
+    writer = SharedFrameRing(path, slots=3, create=True)
+    reader = SharedFrameRing(path)
+    assert reader.read_latest() is None
+    thumbnail = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    for i in range(5):
+        assert writer.write(bytes([i]) * (100 + i), thumbnail, 0.01, 0.02)
+    seq, jpeg, small, read_seconds, encode_seconds = reader.read_latest()
+    assert seq == 5 and jpeg == bytes([4]) * 104
+    np.testing.assert_array_equal(small, thumbnail)
+    assert (read_seconds, encode_seconds) == (0.01, 0.02)
+    writer.mark_stopped()
+    assert reader.stopped
+    reader.close()
+    writer.close()
+
+
+def test_ring_rejects_oversized_frame(tmp_path):
+    ring = SharedFrameRing(str(tmp_path / 'camera.ring'), slots=2, create=True)
+    assert not ring.write(b'\0' * (FRAME_SLOT_BYTES + 1), None, 0.0, 0.0)
+    assert ring.latest_seq == 0
+    assert ring.write(b'jpeg', None, 0.0, 0.0)
+    seq, jpeg, small, _, _ = ring.read_latest()
+    assert (seq, jpeg, small) == (1, b'jpeg', None)
+    ring.close()
+
+
+def test_remove_stale_rings(tmp_path):
+    # pid за пределом pid_max Linux не может принадлежать живому процессу
+    stale = tmp_path / 'robot_camera_99999999_0.ring'
+    live = tmp_path / f'robot_camera_{os.getpid()}_0.ring'
+    other = tmp_path / 'robot_telemetry_100x17.buf'
+    for path in (stale, live, other):
+        path.touch()
+    assert remove_stale_rings(str(tmp_path)) == 1
+    assert not stale.exists() and live.exists() and other.exists()
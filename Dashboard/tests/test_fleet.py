@@ -0,0 +1,37 @@
+import numpy as np
+
+from alert_log import AlertEventLog
+from fleet import FleetAlertRecorder, SharedFleetState
+from telemetry import CHANNELS, CHANNEL_INDEX
+
+
+def normal_rows(n):
+    rows = np.zeros((n, len(CHANNELS)))
+    rows[:, CHANNEL_INDEX['motor_temp']] = 40.0
+    rows[:, CHANNEL_INDEX['vibration']] = 0.1
+    rows[:, CHANNEL_INDEX['voltage']] = 24.5
+    rows[:, CHANNEL_INDEX['current']] = 3.0
+    return rows
+
+
+def test_fleet_transitions_reach_alert_log(tmp_path):
+    state = SharedFleetState(capacity=8, directory=str(tmp_path))
+    log = AlertEventLog(str(tmp_path / 'alerts.sqlite'))
+    recorder = FleetAlertRecorder(state, log, rate_hz=2.0)
+    rows = normal_rows(3)
+    rows[1:, CHANNEL_INDEX['voltage']] = 19.0
+    # Робот дашборда (0) в журнал парка не пишется
+    for seen in (100.0, 100.5, 101.0):
+        state.update([0, 17, 42], rows, seen=seen)
+        recorder.poll()
+    events, _ = log.query(robot=17)
+    assert [(e['parameter'], e['severity'], e['end']) for e in events] == [('battery_voltage', 2, None)]
+    assert log.query(robot=42)[0] and not log.query(robot=0)[0]
+
+    rows[1, CHANNEL_INDEX['voltage']] = 24.5
+    for seen in (101.5, 102.0, 102.5):
+        state.update([0, 17, 42], rows, seen=seen)
+        recorder.poll()
+    events, _ = log.query(robot=17)
+    assert events[0]['end'] is not None
+    log.close()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from history import LEVEL_FACTOR, HistoryStore, lttb
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[437] = 5.0
+    y[802] = -3.0
+    sx, sy = lttb(x, y, 20)
+    assert len(sx) == 20
+    assert sx[0] == 0 and sx[-1] == 999
+    assert 437 in sx and 802 in sx
+    assert np.all(np.diff(sx) > 0)
+
+
+def test_lttb_returns_short_series_unchanged():
+    x, y = np.arange(5.0), np.arange(5.0) ** 2
+    sx, sy = lttb(x, y, 10)
+    assert sx is x and sy is y
+
+
+def fill(store, n, seed=0):
+    rng = np.random.default_rng(seed)
+    times = np.arange(n) * 0.1
+    columns = {ch: rng.normal(size=n).astype(np.float32) for ch in store.channels}
+    store.append(times, columns)
+    return times, columns
+
+
+def test_query_minmax_matches_raw(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    # Больше двух уровней сводок и неполные блоки по краям диапазона
+    n = LEVEL_FACTOR ** 2 * 5 + 123
+    times, columns = fill(store, n)
+    raw = columns['vibration']
+    start, end = times[1000], times[n - 777]
+    result = store.query('vibration', start, end, points=4)
+    selected = raw[1000:n - 776]
+    assert len(result['time']) <= 4
+    assert result['time'][0] == start
+    assert result['min'].min() == selected.min()
+    assert result['max'].max() == selected.max()
+
+
+def test_query_lttb_and_empty_range(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    times, columns = fill(store, 5000)
+    result = store.query('motor_temp', points=100, mode='lttb')
+    assert len(result['time']) == 100
+    assert result['time'][0] == times[0] and result['time'][-1] == times[-1]
+    empty = store.query('motor_temp', start=1e9)
+    assert len(empty['time']) == 0
+
+
+def test_reader_sees_appends_from_other_instance(tmp_path):
+    writer = HistoryStore(str(tmp_path))
+    reader = HistoryStore(str(tmp_path))
+    fill(writer, 100)
+    writer.flush()
+    assert reader.index_range() == (0, 100)
+    fill(writer, 50, seed=1)
+    writer.flush()
+    assert reader.index_range() == (0, 150)
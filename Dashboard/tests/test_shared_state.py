@@ -0,0 +1,41 @@
+import numpy as np
+
+from shared_state import SharedTelemetryBuffer
+from telemetry import CHANNELS
+
+
+def make_rows(start, n):
+    return np.arange(start, start + n, dtype=np.float64)[:, None] + np.zeros(len(CHANNELS))
+
+
+def test_round_trip_across_wraparound(tmp_path):
+    buffer = SharedTelemetryBuffer(8, directory=str(tmp_path))
+    assert buffer.try_become_writer()
+    buffer.extend(make_rows(0, 5))
+    buffer.extend(make_rows(5, 6))
+    assert len(buffer) == 8 and buffer.count == 11
+    np.testing.assert_array_equal(buffer.snapshot()[:, 0], np.arange(3, 11))
+    np.testing.assert_array_equal(buffer.snapshot(2)[:, 0], [9, 10])
+    assert buffer.latest()[CHANNELS[0]] == 10
+
+
+def test_since_returns_only_new_rows(tmp_path):
+    buffer = SharedTelemetryBuffer(8, directory=str(tmp_path))
+    buffer.try_become_writer()
+    buffer.extend(make_rows(0, 3))
+    rows, count = buffer.since(0)
+    assert count == 3 and rows[:, 0].tolist() == [0, 1, 2]
+    buffer.extend(make_rows(3, 20))
+    # Отсчеты старше емкости буфера теряются
+    rows, count = buffer.since(count)
+    assert count == 11 and rows[:, 0].tolist() == list(range(15, 23))
+
+
+def test_reader_sees_writer_data(tmp_path):
+    writer = SharedTelemetryBuffer(16, directory=str(tmp_path))
+    reader = SharedTelemetryBuffer(16, directory=str(tmp_path))
+    assert writer.try_become_writer()
+    # Блокировка файла занята: второй экземпляр остается читателем
+    assert not reader.try_become_writer()
+    writer.extend(make_rows(0, 4))
+    np.testing.assert_array_equal(reader.snapshot(), writer.snapshot())
@@ -0,0 +1,123 @@
+import socket
+import struct
+import threading
+
+import numpy as np
+from numpy.lib import recfunctions
+
+from telemetry import CHANNELS
+
+UDP_HOST = '0.0.0.0'
+UDP_PORT = 9870
+
+# Заголовок пакета: сигнатура, версия, id робота, число записей, номер пакета
+PACKET_MAGIC = b'RBT1'
+PACKET_VERSION = 1
+HEADER = struct.Struct('<4sHHHxxI')
+
+# Запись телеметрии фиксированного формата: каналы telemetry.CHANNELS, время — float64
+RECORD_DTYPE = np.dtype([(name, '<f8' if name == 'time' else '<f4') for name in CHANNELS])
+# Записей в пакете: 20 × 64 байта укладываются в один кадр Ethernet
+DEFAULT_BATCH = 20
+MAX_DATAGRAM = 65507
+
+
+def pack_packet(records, robot_id=0, seq=0):
+    """Собирает датаграмму из структурированного массива записей RECORD_DTYPE"""
+    records = np.ascontiguousarray(records, dtype=RECORD_DTYPE)
+    header = HEADER.pack(PACKET_MAGIC, PACKET_VERSION, robot_id, len(records), seq)
+    return header + records.tobytes()
+
+
+def rows_to_records(rows):
+    """Строки буфера телеметрии (n, len(CHANNELS)) -> записи RECORD_DTYPE"""
+    return recfunctions.unstructured_to_structured(np.asarray(rows, dtype=np.float64), dtype=RECORD_DTYPE)
+
+
+def parse_packet(data):
+    """Разбирает датаграмму без копирования: (robot_id, seq, записи) или None, если пакет битый"""
+    if len(data) < HEADER.size:
+        return None
+    magic, version, robot_id, count, seq = HEADER.unpack_from(data)
+    if magic != PACKET_MAGIC or version != PACKET_VERSION:
+        return None
+    if len(data) != HEADER.size + count * RECORD_DTYPE.itemsize:
+        return None
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+    return robot_id, seq, records
+
+
+# Прием телеметрии по UDP: пакеты разбираются numpy.frombuffer и сразу пишутся в буфер
+class UdpTelemetryReceiver:
+    def __init__(self, buffer, host=UDP_HOST, port=UDP_PORT, robot_id=None):
+        self.buffer = buffer
+        self.host = host
+        self.port = port
+        # None — принимать пакеты любого робота
+        self.robot_id = robot_id
+        self.packets = 0
+        self.samples = 0
+        self.bad_packets = 0
+        self.lost_packets = 0
+        self._last_seq = None
+        self._sock = None
+        self._running = False
+        self._thread = None
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Большой приемный буфер сглаживает всплески на килогерцовых частотах
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        sock.bind((self.host, self.port))
+        sock.settimeout(0.5)
+        self._sock = sock
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def handle(self, data):
+        """Разбирает одну датаграмму и дописывает ее записи в буфер"""
+        parsed = parse_packet(data)
+        if parsed is None:
+            self.bad_packets += 1
+            return 0
+        robot_id, seq, records = parsed
+        if self.robot_id is not None and robot_id != self.robot_id:
+            return 0
+        if self._last_seq is not None and seq > self._last_seq + 1:
+            self.lost_packets += seq - self._last_seq - 1
+        self._last_seq = seq
+        self.packets += 1
+        self.samples += len(records)
+        self.buffer.extend(recfunctions.structured_to_unstructured(records, dtype=np.float64))
+        return len(records)
+
+    def start(self):
+        if self._running:
+            return
+        if self._sock is None:
+            self.bind()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="udp-telemetry")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _run(self):
+        # Датаграммы читаются в заранее выделенный буфер без лишних аллокаций
+        datagram = bytearray(MAX_DATAGRAM)
+        view = memoryview(datagram)
+        while self._running:
+            try:
+                size = self._sock.recv_into(datagram)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.handle(view[:size])